@@ -19,14 +19,18 @@
 #   1.0    2016-06-28    Initial release for bus selection.
 #   1.1    2017-02-02    Added class SPI_MCP2210_WINDLL. Removed version number
 #                        from file names
+#   1.2    2026-10-17    Added class I2C_MUX.
+#   1.3    2026-10-17    Added class BUS_STATISTICS.
 #
 #
 
 DRIVERS = {}
+DRIVERS["busstatistics"] = ["BUS_STATISTICS"]
 DRIVERS["i2cdev"]       = ["I2C_DEV"]
 DRIVERS["i2cmock"]      = ["I2C_MOCK"]
 DRIVERS["i2cmcphidraw"] = ["I2C_MCP2221_HIDRAW"]
 DRIVERS["i2cmcpwindll"] = ["I2C_MCP2221_WINDLL"]
+DRIVERS["i2cmux"]       = ["I2C_MUX"]
 DRIVERS["spidev"]       = ["SPI_DEV"]
 DRIVERS["spimock"]      = ["SPI_MOCK"]
 DRIVERS["spimcphidraw"] = ["SPI_MCP2210_HIDRAW"]
@@ -0,0 +1,136 @@
+#   Copyright 2026 Andreas Riegg - t-h-i-n-x.net
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+#   ----------------------------------------------------------------------------
+#
+#   Changelog
+#
+#   1.0    2026-10-17    Initial release.
+#
+#   1.1    2026-10-17    Added usage statistics.
+#
+#   1.2    2026-10-17    Openers and closers run without holding the registry lock.
+#
+#   Implementation and usage remarks
+#
+#   Registry for physical bus adapters that are shared by several bus
+#   instances, e.g. one /dev/i2c-X node used by all I2C slaves attached to
+#   that adapter. The first acquire() of a device opens the adapter via the
+#   provided opener function, each further acquire() just counts one more
+#   user. The last release() closes the adapter via the provided closer
+#   function.
+#
+#   The opener runs without holding the registry lock, so an opener may itself
+#   acquire other devices of the same registry (e.g. a pooled bus whose
+#   constructor opens another pooled bus). Concurrent acquire() calls for a device
+#   that is just being opened wait until the opener has finished. If the opener
+#   fails, its exception is raised and the waiting callers retry the opening. An
+#   opener that acquires its own device raises an exception instead of waiting
+#   for itself. Likewise, the closer runs without the registry lock and may
+#   release other devices, acquire() calls for the device wait until it is closed.
+#
+#   Each adapter has its own lock that has to be used to serialize the
+#   access to the adapter. Adapters on different devices are independent
+#   from each other.
+#
+#   statistics() returns the number of users per opened adapter and the total
+#   number of acquire(), release(), open and close operations.
+#
+
+from threading import Condition, Lock, RLock, current_thread
+
+
+class Adapter():
+    def __init__(self, device, fd=0):
+        self.device = device
+        self.fd = fd
+        self.users = 0
+        self.lock = RLock()
+
+    def __str__(self):
+        return "Adapter(dev=%s users=%d)" % (self.device, self.users)
+
+
+class AdapterRegistry():
+    def __init__(self):
+        self.adapters = {}
+        self.opening = {}
+        self.lock = Lock()
+        self.openingDone = Condition(self.lock)
+        self.acquired = 0
+        self.released = 0
+        self.opened = 0
+        self.closed = 0
+
+    def acquire(self, device, opener):
+        with self.lock:
+            while device in self.opening:
+                if self.opening[device] is current_thread():
+                    raise Exception("Error: %s is acquired while it is being opened or closed" % device)
+                self.openingDone.wait()
+            adapter = self.adapters.get(device)
+            if adapter is not None:
+                adapter.users += 1
+                self.acquired += 1
+                return adapter
+            self.opening[device] = current_thread()
+        try:
+            adapter = opener(device)
+        except Exception:
+            with self.lock:
+                del self.opening[device]
+                self.openingDone.notify_all()
+            raise
+        with self.lock:
+            del self.opening[device]
+            self.adapters[device] = adapter
+            self.opened += 1
+            adapter.users += 1
+            self.acquired += 1
+            self.openingDone.notify_all()
+            return adapter
+
+    def release(self, device, closer):
+        with self.lock:
+            adapter = self.adapters.get(device)
+            if adapter is None:
+                return
+            adapter.users -= 1
+            self.released += 1
+            if adapter.users > 0:
+                return
+            del self.adapters[device]
+            self.closed += 1
+            self.opening[device] = current_thread()
+        try:
+            closer(adapter)
+        finally:
+            with self.lock:
+                del self.opening[device]
+                self.openingDone.notify_all()
+
+    def get(self, device):
+        with self.lock:
+            return self.adapters.get(device)
+
+    def statistics(self):
+        with self.lock:
+            users = {}
+            for device in self.adapters:
+                users[device] = self.adapters[device].users
+            return {"users": users,
+                    "acquired": self.acquired,
+                    "released": self.released,
+                    "opened": self.opened,
+                    "closed": self.closed}
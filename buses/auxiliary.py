@@ -18,16 +18,97 @@
 #
 #   1.0    2017-02-26    Initial release.
 #
+#   1.1    2026-10-17    Process-wide pool of shared auxiliary bus instances.
+#
+#   1.2    2026-10-17    Additional constructor arguments for auxiliary buses.
+#
+#   1.3    2026-10-17    Conflicting constructor arguments raise an error.
+#
+#   Implementation and usage remarks
+#
+#   Auxiliary buses are pooled per bus template name. The first call of
+#   openAuxiliaryBus() for a bus name creates the bus instance from the template,
+#   each further call returns the same instance and counts one more user. Each
+#   user has to call closeAuxiliaryBus() with the same bus name when it does not
+#   need the bus any more, the last call closes the bus instance.
+#   The constructor of a pooled bus may itself open other pooled buses, e.g. an
+#   I2C_MUX or a USB-ISS bus that is used as auxiliary bus of another layered bus.
+#
+#   Additional keyword arguments of openAuxiliaryBus() are passed to the bus class
+#   together with the arguments of the template when the bus instance is created,
+#   e.g. the slave address for an auxiliary I2C bus. When the bus instance already
+#   exists, the additional keyword arguments have to match the arguments the
+#   instance was created with, otherwise an exception is raised (e.g. for two SPI
+#   recorders of the same bus with different speed: parameters). Only the slave
+#   argument is not checked, as layered I2C buses set the slave address of the
+#   shared instance for each call.
+#
+#   Each pooled bus has a lock (see getAuxiliaryBusLock()) that layered buses can
+#   use to serialize their access to the shared auxiliary bus.
+#
+#   auxiliaryBusStatistics() returns the number of users per pooled bus and the
+#   total number of open, close, acquire and release operations of the pool.
+#
 
 from webiopi.utils.logger import debug
 from webiopi.devices.bustemplate import busTemplate
+from webiopi.devices.buses.adapters import Adapter, AdapterRegistry
+from webiopi.utils.types import toint
+
+#Pool of opened auxiliary buses
+AUXILIARY_BUSES = AdapterRegistry()
+
+#Constructor arguments that users of a pooled bus set per call
+AUXILIARY_BUS_CALL_KWARGS = ("slave",)
+
+def auxiliaryBusStatistics():
+    return AUXILIARY_BUSES.statistics()
+
 
 class AuxiliaryBus():
 
-    def openAuxiliaryBus(self, busName=None):
+    def openAuxiliaryBus(self, busName=None, **extraKwargs):
+        creator = lambda name: self.__createAuxiliaryBus__(name, extraKwargs)
+        entry = AUXILIARY_BUSES.acquire(busName, creator)
+        for name in extraKwargs:
+            if name in AUXILIARY_BUS_CALL_KWARGS:
+                continue
+            if not self.__sameAuxiliaryBusArgument__(entry.kwargs.get(name), extraKwargs[name]):
+                self.closeAuxiliaryBus(busName)
+                raise Exception("Auxiliary bus \'%s\' is already opened with %s=%s, not %s." % (busName, name, entry.kwargs.get(name), extraKwargs[name]))
+        return entry.bus
+
+    def closeAuxiliaryBus(self, busName):
+        AUXILIARY_BUSES.release(busName, self.__destroyAuxiliaryBus__)
+
+    def getAuxiliaryBusLock(self, busName):
+        entry = AUXILIARY_BUSES.get(busName)
+        if entry is None:
+            raise Exception("Auxiliary bus \'%s\' is not opened." % busName)
+        return entry.lock
+
+    def __createAuxiliaryBus__(self, busName, extraKwargs={}):
         debug("Opening auxiliary bus - %s"  % busName)
         busClass, kwargs = self.__getAuxiliaryBusPattern__(busName)
-        return busClass(**kwargs)
+        if len(extraKwargs) > 0:
+            kwargs = dict(kwargs)
+            kwargs.update(extraKwargs)
+        entry = Adapter(busName)
+        entry.bus = busClass(**kwargs)
+        entry.kwargs = kwargs
+        return entry
+
+    def __destroyAuxiliaryBus__(self, entry):
+        debug("Closing auxiliary bus - %s"  % entry.device)
+        entry.bus.close()
+
+    def __sameAuxiliaryBusArgument__(self, value, other):
+        if (value is None) or (other is None):
+            return value is other
+        try:
+            return toint(value) == toint(other)
+        except (AttributeError, TypeError, ValueError):
+            return str(value) == str(other)
 
     def __getAuxiliaryBusPattern__(self, busName):
         bustemplate = self.__getAuxiliaryBusTemplate__(busName)
@@ -0,0 +1,219 @@
+#   Copyright 2026 Andreas Riegg - t-h-i-n-x.net
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+#   ----------------------------------------------------------------------------
+#
+#   Changelog
+#
+#   1.0    2026-10-17    Initial release.
+#
+#   1.1    2026-10-17    BUS_STATISTICS registered in the bus driver lookup.
+#
+#   Implementation and usage remarks
+#
+#   Traffic statistics per bus and slave. The statistics are only collected by the
+#   monitor bus devices (I2C_MONITOR, SPI_MONITOR, UART_MONITOR, see busmonitor),
+#   the bus devices themselves (e.g. I2C_DEV) do not count their traffic. So only
+#   devices that use a monitor as bus show up in the statistics.
+#
+#   busStatistics(bus, slave) returns the BusStatistics entry for a bus name and
+#   slave address (None for buses without slave addresses), creating it on first
+#   use. The monitors get their entry once and call add() for each transfer with
+#   the kind of transfer, the number of data bytes and the duration in seconds.
+#   All counters are allocated when the entry is created, add() only increments
+#   them.
+#
+#   Each entry counts per kind (read, write, xfer, transaction) the number of
+#   transfers and the number of data bytes (including register address bytes),
+#   the number of failed transfers, the total and maximum duration and a
+#   histogram of the durations with logarithmic buckets: bucket "N" counts the
+#   transfers that took less than N microseconds (and at least N/2), the last
+#   bucket counts all longer transfers.
+#
+#   Python API:
+#   - getBusStatistics(bus=None) returns the values of all (or one) buses as
+#     dictionary {bus: {"total": values, "slaves": {"0x40": values, ...}}}. The
+#     totals of a bus are summed up from its slaves. "utilization" is the part
+#     of the time since the last reset the bus was busy with transfers, so the
+#     slave with the highest utilization is the one that saturates a shared bus.
+#   - resetBusStatistics(bus=None) resets all (or one) buses.
+#
+#   REST API: BUS_STATISTICS is registered in DRIVERS of the buses package.
+#   Declare a BUS_STATISTICS device in the [DEVICES] section next to the devices
+#   that use monitors, e.g.
+#
+#   [BUSES]
+#   i2c1 = I2C_DEV dev:i2c-1
+#   mon1 = I2C_MONITOR dev:i2c1
+#
+#   [DEVICES]
+#   tmp = TMP102 bus:mon1
+#   busstats = BUS_STATISTICS
+#
+#   GET  /devices/busstats/statistics/*        values of all buses
+#   GET  /devices/busstats/statistics/<bus>    values of one bus
+#   POST /devices/busstats/statistics/reset    reset all buses
+#
+
+from webiopi.utils.types import M_JSON
+from webiopi.decorators.rest import request, response
+from threading import Lock
+import time
+
+monotonic = getattr(time, "monotonic", time.time)
+
+STATISTICS_READ          = 0
+STATISTICS_WRITE         = 1
+STATISTICS_XFER          = 2
+STATISTICS_TRANSACTION   = 3
+STATISTICS_KINDS         = ("read", "write", "xfer", "transaction")
+
+LATENCY_BUCKETS          = 24 # 1 us ... 4.2 s
+
+#Registry of statistics per (bus, slave)
+STATISTICS = {}
+STATISTICSLOCK = Lock()
+
+
+def busStatistics(bus, slave=None):
+    with STATISTICSLOCK:
+        statistics = STATISTICS.get((bus, slave))
+        if statistics is None:
+            statistics = BusStatistics(bus, slave)
+            STATISTICS[(bus, slave)] = statistics
+        return statistics
+
+def getBusStatistics(bus=None):
+    with STATISTICSLOCK:
+        entries = [s for s in STATISTICS.values() if (bus is None) or (s.bus == bus)]
+    buses = {}
+    for statistics in entries:
+        values = buses.setdefault(statistics.bus, {"total": BusStatistics(statistics.bus), "slaves": {}})
+        if statistics.slave is None:
+            slave = "none"
+        else:
+            slave = "0x%02X" % statistics.slave
+        values["slaves"][slave] = statistics.values()
+        values["total"].addAll(statistics)
+    for name in buses:
+        buses[name]["total"] = buses[name]["total"].values()
+    return buses
+
+def resetBusStatistics(bus=None):
+    with STATISTICSLOCK:
+        entries = [s for s in STATISTICS.values() if (bus is None) or (s.bus == bus)]
+    for statistics in entries:
+        statistics.reset()
+
+
+class BusStatistics():
+    def __init__(self, bus, slave=None):
+        self.bus = bus
+        self.slave = slave
+        self.lock = Lock()
+        self.counts = [0] * len(STATISTICS_KINDS)
+        self.bytes = [0] * len(STATISTICS_KINDS)
+        self.histogram = [0] * LATENCY_BUCKETS
+        self.reset()
+
+    def __str__(self):
+        return "BusStatistics(bus=%s slave=%s)" % (self.bus, self.slave)
+
+    def reset(self):
+        with self.lock:
+            for i in range(len(STATISTICS_KINDS)):
+                self.counts[i] = 0
+                self.bytes[i] = 0
+            for i in range(LATENCY_BUCKETS):
+                self.histogram[i] = 0
+            self.errors = 0
+            self.busyTime = 0.0
+            self.maxTime = 0.0
+            self.since = monotonic()
+
+    def add(self, kind, size, duration, error=False):
+        bucket = int(duration * 1000000).bit_length()
+        if bucket >= LATENCY_BUCKETS:
+            bucket = LATENCY_BUCKETS - 1
+        with self.lock:
+            self.counts[kind] += 1
+            self.bytes[kind] += size
+            self.histogram[bucket] += 1
+            self.busyTime += duration
+            if duration > self.maxTime:
+                self.maxTime = duration
+            if error:
+                self.errors += 1
+
+    def addAll(self, other):
+        with other.lock:
+            for i in range(len(STATISTICS_KINDS)):
+                self.counts[i] += other.counts[i]
+                self.bytes[i] += other.bytes[i]
+            for i in range(LATENCY_BUCKETS):
+                self.histogram[i] += other.histogram[i]
+            self.errors += other.errors
+            self.busyTime += other.busyTime
+            self.maxTime = max(self.maxTime, other.maxTime)
+            self.since = min(self.since, other.since)
+
+    def values(self):
+        with self.lock:
+            values = {}
+            for i in range(len(STATISTICS_KINDS)):
+                values["%ss" % STATISTICS_KINDS[i]] = self.counts[i]
+                values["%s bytes" % STATISTICS_KINDS[i]] = self.bytes[i]
+            histogram = {}
+            for i in range(LATENCY_BUCKETS - 1):
+                histogram["%d" % (1 << i)] = self.histogram[i]
+            histogram["more"] = self.histogram[LATENCY_BUCKETS - 1]
+            values["latency us"] = histogram
+            values["errors"] = self.errors
+            values["busy time"] = self.busyTime
+            values["max time"] = self.maxTime
+            elapsed = monotonic() - self.since
+            if elapsed > 0:
+                values["utilization"] = self.busyTime / elapsed
+            else:
+                values["utilization"] = 0.0
+            return values
+
+
+#---------- REST access device ----------
+
+class BUS_STATISTICS():
+    def __init__(self):
+        pass
+
+    def __str__(self):
+        return "BUS_STATISTICS"
+
+    def __family__(self):
+        return "BusStatistics"
+
+    @request("GET", "statistics/*")
+    @response(contentType=M_JSON)
+    def getAllStatistics(self):
+        return getBusStatistics()
+
+    @request("GET", "statistics/%(bus)s")
+    @response(contentType=M_JSON)
+    def getStatistics(self, bus):
+        return getBusStatistics(bus)
+
+    @request("POST", "statistics/reset")
+    @response("%s")
+    def resetStatistics(self):
+        resetBusStatistics()
+        return "Statistics reset."
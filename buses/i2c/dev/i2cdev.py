@@ -20,13 +20,50 @@
 #   1.1    2016-06-28    Patched version for bus selection. Commented out unused
 #                        I2C ioctl commands.
 #   1.2    2016-07-28    Merged with original version from WebIOPi 0.7.22
+#   1.3    2026-10-17    Register access via combined I2C_RDWR transactions.
+#   1.4    2026-10-17    Added transaction() for batched multi-message transfers.
+#   1.5    2026-10-17    Share one file descriptor per adapter for all slaves.
+#   1.6    2026-10-17    Moved I2C_Message to its own module for use by other buses.
+#   1.7    2026-10-17    Close the file descriptor when the adapter cannot be queried.
 #
+#   Implementation and usage remarks
+#
+#   readRegister(s) and writeRegister(s) use the I2C_RDWR ioctl when the
+#   adapter supports plain I2C messages. A register read is then sent as one
+#   write message (register address) and one read message with a repeated
+#   start in between, all within one single syscall. This avoids the STOP
+#   between address write and data read and no other transfer can sneak in
+#   between. Adapters that only support SMBus fall back to the separate
+#   write and read calls of I2C_Bus.
+#
+#   transaction() executes a list of I2C_Message objects in one I2C_RDWR
+#   ioctl. Each message is either a write (data) or a read (size) and may
+#   address another slave on the same adapter than the bus instance itself.
+#   The result is a list with one entry per message, a bytearray for read
+#   messages and None for write messages. Example:
+#
+#   results = bus.transaction([I2C_Message(data=[0x80]), I2C_Message(size=5),
+#                              I2C_Message(data=[0x88]), I2C_Message(size=5)])
+#
+#   The kernel limits the number of messages per transaction to 42.
+#
+#   All I2C_DEV instances on the same /dev/i2c-X node share one file
+#   descriptor and one lock via the adapter registry. The node is opened
+#   with the first slave and closed with the last one. As I2C_RDWR carries
+#   the slave address in each message, no I2C_SLAVE binding is needed. For
+#   SMBus-only adapters the slave is bound before each access while holding
+#   the adapter lock.
 #
 
+import os
 import fcntl
+import ctypes
 
 #from webiopi.utils.version import BOARD_REVISION
 from webiopi.devices.bus import Bus, I2C_Bus
+from webiopi.devices.buses.adapters import Adapter, AdapterRegistry
+from webiopi.devices.buses.i2cmessage import I2C_Message
+from webiopi.utils.logger import debug
 
 
 # /dev/i2c-X ioctl commands.  The ioctl's parameter is always an
@@ -47,23 +84,196 @@ I2C_SLAVE       = 0x0703    # Use this slave address
                             # is already in use by a driver!
 #I2C_TENBIT      = 0x0704    # 0 for 7 bit addrs, != 0 for 10 bit
 
-#I2C_FUNCS       = 0x0705    # Get the adapter functionality mask
+I2C_FUNCS       = 0x0705    # Get the adapter functionality mask
 
-#I2C_RDWR        = 0x0707    # Combined R/W transfer (one STOP only)
+I2C_RDWR        = 0x0707    # Combined R/W transfer (one STOP only)
 
 #I2C_PEC         = 0x0708    # != 0 to use PEC with SMBus
 #I2C_SMBUS       = 0x0720    # SMBus transfer */
 
+# i2c_msg flags and adapter functionality bits from linux/i2c.h
+I2C_M_RD        = 0x0001    # read data, from slave to master
+I2C_FUNC_I2C    = 0x00000001
+
+I2C_RDWR_IOCTL_MAX_MSGS = 42
+
+#Registry of opened /dev/i2c-X adapters
+ADAPTERS = AdapterRegistry()
+
+
+class i2c_msg(ctypes.Structure):
+    _fields_ = [("addr",  ctypes.c_uint16),
+                ("flags", ctypes.c_uint16),
+                ("len",   ctypes.c_uint16),
+                ("buf",   ctypes.POINTER(ctypes.c_uint8))]
+
+class i2c_rdwr_ioctl_data(ctypes.Structure):
+    _fields_ = [("msgs",  ctypes.POINTER(i2c_msg)),
+                ("nmsgs", ctypes.c_uint32)]
+
 
 class I2C_DEV(I2C_Bus):
     def __init__(self, dev, slave):
+        self.adapter = None
         Bus.__init__(self, "I2CDEV", "/dev/" + dev)
         I2C_Bus.__init__(self, slave)
         self.slave = slave
-        
-        if fcntl.ioctl(self.fd, I2C_SLAVE, self.slave):
-            raise Exception("Error binding I2C slave 0x%02X" % self.slave)
-        
+
     def __str__(self):
         return "I2C_DEV(slave=0x%02X)" % self.slave
-    
+
+#---------- BUS open() and close() reimplementation to share one file descriptor per adapter ----------
+
+    def open(self):
+        self.adapter = ADAPTERS.acquire(self.device, self.__openAdapter__)
+        self.fd = self.adapter.fd
+
+    def close(self):
+        if self.adapter is not None:
+            ADAPTERS.release(self.device, self.__closeAdapter__)
+            self.adapter = None
+            self.fd = 0
+        I2C_Bus.close(self)
+
+#---------- Bus abstraction read/write addressing the slave per message ----------
+
+    def read(self, size=1):
+        if not self.adapter.rdwr:
+            with self.adapter.lock:
+                self.__bindSlave__(self.slave)
+                return os.read(self.fd, size)
+        rbuff = (ctypes.c_uint8 * size)()
+        msgs = (i2c_msg * 1)()
+        self.__setMessage__(msgs[0], self.slave, I2C_M_RD, rbuff, size)
+        self.__rdwr__(msgs, 1)
+        return bytes(bytearray(rbuff))
+
+    def write(self, string):
+        if not self.adapter.rdwr:
+            with self.adapter.lock:
+                self.__bindSlave__(self.slave)
+                return os.write(self.fd, string)
+        data = bytearray(string)
+        wbuff = (ctypes.c_uint8 * len(data)).from_buffer(data)
+        msgs = (i2c_msg * 1)()
+        self.__setMessage__(msgs[0], self.slave, 0, wbuff, len(data))
+        self.__rdwr__(msgs, 1)
+        return len(data)
+
+#---------- I2C abstraction register access via combined I2C_RDWR transactions ----------
+
+    def readRegister(self, addr):
+        return self.readRegisters(addr, 1)[0]
+
+    def readRegisters(self, addr, count):
+        if not self.adapter.rdwr:
+            with self.adapter.lock:
+                return I2C_Bus.readRegisters(self, addr, count)
+        wbuff = (ctypes.c_uint8 * 1)(addr)
+        rbuff = (ctypes.c_uint8 * count)()
+        msgs = (i2c_msg * 2)()
+        self.__setMessage__(msgs[0], self.slave, 0, wbuff, 1)
+        self.__setMessage__(msgs[1], self.slave, I2C_M_RD, rbuff, count)
+        self.__rdwr__(msgs, 2)
+        return bytearray(rbuff)
+
+    def writeRegister(self, addr, byte):
+        self.writeRegisters(addr, bytearray([byte]))
+
+    def writeRegisters(self, addr, buff):
+        if not self.adapter.rdwr:
+            return I2C_Bus.writeRegisters(self, addr, buff)
+        size = len(buff) + 1
+        wbuff = (ctypes.c_uint8 * size)()
+        wbuff[0] = addr
+        wbuff[1:] = bytearray(buff)
+        msgs = (i2c_msg * 1)()
+        self.__setMessage__(msgs[0], self.slave, 0, wbuff, size)
+        self.__rdwr__(msgs, 1)
+
+#---------- Batched multi-message transactions ----------
+
+    def transaction(self, messages):
+        count = len(messages)
+        if count > I2C_RDWR_IOCTL_MAX_MSGS:
+            raise Exception("Error: I2C transaction can only contain max %d messages." % I2C_RDWR_IOCTL_MAX_MSGS)
+        if not self.adapter.rdwr:
+            return self.__sequentialTransaction__(messages)
+
+        msgs = (i2c_msg * count)()
+        buffers = []
+        for i in range(count):
+            message = messages[i]
+            slave = self.slave if message.slave is None else message.slave
+            if message.isRead():
+                buff = (ctypes.c_uint8 * message.size)()
+                self.__setMessage__(msgs[i], slave, I2C_M_RD, buff, message.size)
+            else:
+                data = bytearray(message.data)
+                buff = (ctypes.c_uint8 * len(data)).from_buffer(data)
+                self.__setMessage__(msgs[i], slave, 0, buff, len(data))
+            buffers.append(buff)
+        self.__rdwr__(msgs, count)
+
+        results = []
+        for i in range(count):
+            if messages[i].isRead():
+                results.append(bytearray(buffers[i]))
+            else:
+                results.append(None)
+        return results
+
+#---------- Helpers ----------
+
+    def __openAdapter__(self, device):
+        debug("Opening I2C adapter - %s" % device)
+        fd = os.open(device, self.flag)
+        if fd < 0:
+            raise Exception("Cannot open %s" % device)
+        adapter = Adapter(device, fd)
+        funcs = ctypes.c_ulong(0)
+        try:
+            fcntl.ioctl(fd, I2C_FUNCS, funcs)
+        except Exception:
+            os.close(fd)
+            raise
+        adapter.rdwr = (funcs.value & I2C_FUNC_I2C) != 0
+        adapter.boundSlave = None
+        return adapter
+
+    def __closeAdapter__(self, adapter):
+        debug("Closing I2C adapter - %s" % adapter.device)
+        os.close(adapter.fd)
+
+    def __bindSlave__(self, slave):
+        if self.adapter.boundSlave != slave:
+            if fcntl.ioctl(self.fd, I2C_SLAVE, slave):
+                raise Exception("Error binding I2C slave 0x%02X" % slave)
+            self.adapter.boundSlave = slave
+
+    def __setMessage__(self, msg, slave, flags, buff, size):
+        msg.addr  = slave
+        msg.flags = flags
+        msg.len   = size
+        msg.buf   = ctypes.cast(buff, ctypes.POINTER(ctypes.c_uint8))
+
+    def __sequentialTransaction__(self, messages):
+        results = []
+        with self.adapter.lock:
+            for message in messages:
+                slave = self.slave if message.slave is None else message.slave
+                self.__bindSlave__(slave)
+                if message.isRead():
+                    results.append(bytearray(os.read(self.fd, message.size)))
+                else:
+                    os.write(self.fd, bytearray(message.data))
+                    results.append(None)
+        return results
+
+    def __rdwr__(self, msgs, count):
+        data = i2c_rdwr_ioctl_data(msgs, count)
+        try:
+            with self.adapter.lock:
+                fcntl.ioctl(self.fd, I2C_RDWR, data)
+        except IOError as e:
+            raise Exception("Error in I2C transfer with slave 0x%02X (%s)" % (self.slave, e))
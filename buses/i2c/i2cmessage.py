@@ -0,0 +1,78 @@
+#   Copyright 2026 Andreas Riegg - t-h-i-n-x.net
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+#   ----------------------------------------------------------------------------
+#
+#   Changelog
+#
+#   1.0    2026-10-17    Initial release, moved from I2C_DEV.
+#
+#   1.1    2026-10-17    Shared transaction helpers for layered I2C buses.
+#
+#   Implementation and usage remarks
+#
+#   Message of an I2C transaction as used by the transaction() methods of I2C
+#   bus devices (see I2C_DEV and I2C_MUX). A message is either a write (data)
+#   or a read (size) and may address another slave than the bus device itself.
+#
+#   Helpers for layered I2C buses (e.g. I2C_MUX or the bus wrappers):
+#   - busTransaction(bus, messages) executes the messages via transaction() of the
+#     bus or, if the bus has no transaction(), via sequentialTransaction().
+#   - sequentialTransaction(bus, messages) executes each message as readBytes() or
+#     writeBytes() of the bus with the slave address of the bus set to the slave
+#     of the message. The slave address of the bus is restored afterwards.
+#   - transactionSize(messages) returns the number of data bytes of the messages.
+#
+
+class I2C_Message():
+    def __init__(self, data=None, size=0, slave=None):
+        self.data = data
+        self.size = size
+        self.slave = slave
+
+    def isRead(self):
+        return self.data is None
+
+    def __str__(self):
+        if self.isRead():
+            return "I2C_Message(read=%d)" % self.size
+        return "I2C_Message(write=%d)" % len(self.data)
+
+
+def busTransaction(bus, messages):
+    if hasattr(bus, "transaction"):
+        return bus.transaction(messages)
+    return sequentialTransaction(bus, messages)
+
+def sequentialTransaction(bus, messages):
+    results = []
+    busSlave = bus.slave
+    try:
+        for message in messages:
+            if message.slave is not None:
+                bus.slave = message.slave
+            if message.isRead():
+                results.append(bytearray(bus.readBytes(message.size)))
+            else:
+                bus.writeBytes(bytearray(message.data))
+                results.append(None)
+    finally:
+        bus.slave = busSlave
+    return results
+
+def transactionSize(messages):
+    size = 0
+    for message in messages:
+        size += message.size if message.isRead() else len(message.data)
+    return size
@@ -24,6 +24,18 @@
 #
 #   1.3    2016-07-28    Added compatibilty with slave address detect feature from WebIOPi 0.7.22
 #
+#   1.4    2026-10-17    Register reads via write without STOP and repeated START read.
+#
+#   1.5    2026-10-17    Registry of opened MCP2221 adapters instead of singletons.
+#
+#   1.6    2026-10-17    Transfers of up to 65535 bytes via multiple HID reports.
+#
+#   1.7    2026-10-17    Preallocated HID report buffers per adapter.
+#
+#   1.8    2026-10-17    Resend read requests rejected by a busy I2C engine.
+#
+#   1.9    2026-10-17    Get data responses without data ready are retried.
+#
 #   Implementation and usage remarks
 #
 #   Derived from original WebIOPi I2C class.
@@ -34,29 +46,62 @@
 #   may also change on behalf of the OS and its numbering algorithms between reboots.
 #   This driver makes the assumption that the MCP2221 gets recognized automatically
 #   by the OS as a HID device and attached to the raw OS HID drivers.
-#   This driver has the current limitation of supporting max 60 bytes per single
-#   I2C transfer which in most cases does not matter as typically only a few bytes
-#   are transferred.
+#   I2C transfers can have up to 65535 bytes. Data of transfers longer than 60 bytes
+#   is sent and received via multiple HID reports of 60 data bytes each. For reads,
+#   up to MCP_GET_DATA_PIPELINE_DEPTH get data reports are sent back to back before
+#   their responses are read. For writes, each report has to be acknowledged before
+#   the next one is sent. Write reports and read requests rejected by a busy I2C
+#   engine (e.g. while a slow slave stretches the clock) are resent up to
+#   MCP_MAX_RETRIES times. If a read request is still rejected, the I2C transfer
+#   is cancelled before the error is raised. Get data responses without data
+#   (not ready status or no data bytes) are retried up to MCP_MAX_RETRIES times
+#   in a row, from then on only one get data report is in flight at a time.
+#   Only a response with the read error size of 127 bytes fails at once.
 #
 #   I2C standard communication methods are secured by mutual locking to avoid concurent
 #   I2C communication via the same /dev/hidrawX node when multiple I2C chips are
 #   connected to the same MCP2221 and concurrent request occur via the REST API.
 #
+#   Each /dev/hidrawX node is opened once for all slaves connected to that MCP2221
+#   and closed when the last slave is closed. Each MCP2221 has its own lock, so
+#   several MCP2221 adapters can be used in parallel within one process.
+#
+#   Register reads send the register address with the "I2C write data no STOP"
+#   command and read the data with the "I2C read data repeated START" command.
+#   Both HID reports are written back to back before their responses are read,
+#   so a register read needs one USB round trip less and there is no STOP
+#   between address write and data read on the I2C bus.
+#
+#   Each MCP2221 adapter has one preallocated request and one response report
+#   buffer that are reused for all HID reports while holding the adapter lock.
+#   Responses are read directly into the response buffer (via os.readv where
+#   available). Debug messages of HID reports are only formatted when debug
+#   logging is enabled.
+#
 
 from webiopi.devices.bus import Bus, I2C_Bus
-from webiopi.utils.logger import debug, info
-from threading import Lock
+from webiopi.devices.buses.adapters import Adapter, AdapterRegistry
+from webiopi.utils.logger import debug, debugEnabled, info
 from webiopi.utils.types import toint
 import os
 
 #HID report sizes
 MCP_HID_REPORT_SIZE           = 64
 MCP_MAX_TRANSFER_BYTES        = 60
+MCP_MAX_I2C_TRANSFER_BYTES    = 65535
+MCP_EMPTY_REPORT              = bytes(bytearray(MCP_HID_REPORT_SIZE))
+
+#Number of get data reports sent before reading their responses
+MCP_GET_DATA_PIPELINE_DEPTH   = 4
+#Number of resends of reports rejected by a busy I2C engine or without data
+MCP_MAX_RETRIES               = 20
 
 #HID report commands
 MCP_COMMAND_STATUS            = 0x10
 MCP_COMMAND_WRITE_I2C         = 0x90
 MCP_COMMAND_REQUEST_READ_I2C  = 0x91
+MCP_COMMAND_READ_I2C_REPEATED_START = 0x93
+MCP_COMMAND_WRITE_I2C_NO_STOP = 0x94
 MCP_COMMAND_GET_READ_DATA_I2C = 0x40
 
 #HID report subcommands
@@ -65,11 +110,15 @@ MCP_SUB_COMMAND_SET_I2C_SPEED = 0x20
 
 #HID report result codes
 MCP_COMMAND_OK                = 0x00
+MCP_I2C_ENGINE_BUSY           = 0x01
+MCP_I2C_READ_ERROR_SIZE       = 127
 
 #HID report byte offsets
 MCP_I2C_COMMAND               = 0
 MCP_I2C_READ_SIZE             = 1
+MCP_I2C_READ_SIZE_HIGH        = 2
 MCP_I2C_WRITE_SIZE            = 1
+MCP_I2C_WRITE_SIZE_HIGH       = 2
 MCP_I2C_SLAVE_ADDR            = 3
 MCP_I2C_DATA_START            = 4
 MCP_I2C_RESULT_ERROR          = 1
@@ -83,12 +132,12 @@ MCP_I2C_NEW_I2C_CLOCK_DIVIDER = 4
 #100 kHz = 120 (12MHz / 100kHz) Standard Mode
 #400 kHz =  30 (12MHz / 400kHz) Fast Mode
 
-#Singletons
-MCPLOCK = None
-FD = 0
+#Registry of opened MCP2221 adapters
+ADAPTERS = AdapterRegistry()
 
 class I2C_MCP2221_HIDRAW(I2C_Bus):
     def __init__(self, dev, slave, speed=100000):
+        self.adapter = None
         Bus.__init__(self, "I2C", "/dev/" + dev)
         
         self.slave = slave
@@ -97,146 +146,235 @@ class I2C_MCP2221_HIDRAW(I2C_Bus):
             raise ValueError("Maximum I2C speed for MCP2221 is 400,000.0 Hz (%s Hz is given)" % '{:,.1f}'.format(self.speed))
         self.i2cbusdivider = int(12000000 // self.speed)
         I2C_Bus.__init__(self, slave)
-        
-        global MCPLOCK
-        if MCPLOCK is None:
-            MCPLOCK = Lock()
 
         debug("Attached I2C device - %s" % self.__str__())
-        
-        self.setI2CBusSpeed(self.i2cbusdivider)
-        self.getStatus()
+
+        with self.adapter.lock:
+            self.setI2CBusSpeed(self.i2cbusdivider)
+            self.getStatus()
 
     def __str__(self):
         return "%s (slave=0x%02X speed=%s dev=%s)" % (self.__class__.__name__, self.slave, '{:,.1f}'.format(self.speed), self.device)
 
-#---------- BUS open() and close() reimplementation to handle file descriptor singleton ----------
-# TODO: Correct handling of open/close with multiple slaves dynamically
+#---------- BUS open() and close() reimplementation to share one file descriptor per adapter ----------
 
     def open(self):
-        global FD
-        if FD == 0:
-            debug("Opening I2C bus device - %s(dev=%s)"  % (self.__class__.__name__, self.device))
-            self.fd = os.open(self.device, self.flag)
-            if self.fd < 0:
-                raise Exception("Cannot open %s" % self.device)
-            FD = self.fd
-            self.resetI2CTransfer()
-        else:
-            self.fd = FD
+        self.adapter = ADAPTERS.acquire(self.device, self.__openAdapter__)
+        self.fd = self.adapter.fd
 
     def close(self):
-        global FD
-        if FD > 0:
-            self.resetI2CTransfer()
-            debug("Closing I2C bus device - %s(dev=%s)"  % (self.__class__.__name__, self.device))
-            os.close(FD)
-            FD = 0
-            
+        if self.adapter is not None:
+            ADAPTERS.release(self.device, self.__closeAdapter__)
+            self.adapter = None
+            self.fd = 0
         I2C_Bus.close(self)
 
+    def __openAdapter__(self, device):
+        debug("Opening I2C bus device - %s(dev=%s)"  % (self.__class__.__name__, device))
+        self.fd = os.open(device, self.flag)
+        if self.fd < 0:
+            raise Exception("Cannot open %s" % device)
+        self.adapter = Adapter(device, self.fd)
+        self.adapter.wbuff = bytearray(MCP_HID_REPORT_SIZE)
+        self.adapter.rbuff = bytearray(MCP_HID_REPORT_SIZE)
+        self.resetI2CTransfer()
+        return self.adapter
+
+    def __closeAdapter__(self, adapter):
+        with adapter.lock:
+            self.adapter = adapter
+            self.resetI2CTransfer()
+            debug("Closing I2C bus device - %s(dev=%s)"  % (self.__class__.__name__, adapter.device))
+            os.close(adapter.fd)
+
 #---------- I2C Bus abstraction communication methods secured by mutual locking ----------
 
     def readRegister(self, addr):
-        global MCPLOCK
-        with MCPLOCK:
-            self.writeByte(addr)
-            result = self.readByte()
-        return result
+        return self.readRegisters(addr, 1)[0]
 
     def readRegisters(self, addr, count):
-        global MCPLOCK
-        with MCPLOCK:
-            self.writeByte(addr)
-            result = self.readBytes(count)
-        return result
+        return self.readRepeatedStart(addr, count)
 
     def writeRegister(self, addr, byte):
-        global MCPLOCK
-        with MCPLOCK:
+        with self.adapter.lock:
             self.writeBytes([addr, byte])
 
     def writeRegisters(self, addr, buff):
-        global MCPLOCK
-        with MCPLOCK:
-            d = bytearray(len(buff)+1)
-            d[0] = addr
-            d[1:] = buff
-            self.writeBytes(d)
+        d = bytearray(len(buff)+1)
+        d[0] = addr
+        d[1:] = buff
+        self.writeBytes(d)
 
 #---------- Basic read/write communication via HID reports of MCP2221 ----------
 
     def readBytes(self, size=1):
-        if size > MCP_MAX_TRANSFER_BYTES:
-            raise Exception("Error: MCP I2C driver can only read max %d bytes." % MCP_MAX_TRANSFER_BYTES)
-        debug("%s readBytes size=%d" % (self.__str__(), size))
-
-        wbuff = bytearray(MCP_HID_REPORT_SIZE)
-        wbuff[MCP_I2C_COMMAND] = MCP_COMMAND_REQUEST_READ_I2C
-        wbuff[MCP_I2C_READ_SIZE] = size
-        wbuff[MCP_I2C_SLAVE_ADDR] = (self.slave << 1) + 1
-        self.write(wbuff)
-
-        rbuff = bytearray(self.read(MCP_HID_REPORT_SIZE))
-        if (rbuff[MCP_I2C_COMMAND] == MCP_COMMAND_REQUEST_READ_I2C) & (rbuff[MCP_I2C_RESULT_ERROR] != MCP_COMMAND_OK):
-            raise Exception("Error: MCP I2C driver cannot request read data.")
-
-        response = []
-        while len(response) < size:
-            wbuff = bytearray(MCP_HID_REPORT_SIZE)
-            wbuff[MCP_I2C_COMMAND] = MCP_COMMAND_GET_READ_DATA_I2C
+        if size > MCP_MAX_I2C_TRANSFER_BYTES:
+            raise Exception("Error: MCP I2C driver can only read max %d bytes." % MCP_MAX_I2C_TRANSFER_BYTES)
+        if debugEnabled():
+            debug("%s readBytes size=%d" % (self.__str__(), size))
+
+        with self.adapter.lock:
+            self.write(self.__readRequest__(MCP_COMMAND_REQUEST_READ_I2C, size))
+            self.__checkReadResponse__(MCP_COMMAND_REQUEST_READ_I2C, size)
+            return self.__getReadData__(size)
+
+    def readRepeatedStart(self, addr, size=1):
+        if size > MCP_MAX_I2C_TRANSFER_BYTES:
+            raise Exception("Error: MCP I2C driver can only read max %d bytes." % MCP_MAX_I2C_TRANSFER_BYTES)
+        if debugEnabled():
+            debug("%s readRepeatedStart addr=0x%02X size=%d" % (self.__str__(), addr, size))
+
+        with self.adapter.lock:
+            wbuff = self.__newReport__(MCP_COMMAND_WRITE_I2C_NO_STOP)
+            wbuff[MCP_I2C_WRITE_SIZE] = 1
+            wbuff[MCP_I2C_SLAVE_ADDR] = (self.slave << 1)
+            wbuff[MCP_I2C_DATA_START] = addr
+
+            # pipelined: send both reports before reading their responses
             self.write(wbuff)
+            self.write(self.__readRequest__(MCP_COMMAND_READ_I2C_REPEATED_START, size))
 
-            rbuff = bytearray(self.read(MCP_HID_REPORT_SIZE))
-            debug("%s get_i2c_data_received: 0x%02X, 0x%02X, 0x%02X, got=%d, [0x%02X, 0x%02X, 0x%02X, 0x%02X]" % (self.__str__(),rbuff[0],rbuff[1],rbuff[2],rbuff[3],rbuff[4],rbuff[5],rbuff[6],rbuff[7]))
-            if (rbuff[MCP_I2C_COMMAND] == MCP_COMMAND_GET_READ_DATA_I2C) & (rbuff[MCP_I2C_RESULT_ERROR] != MCP_COMMAND_OK):
-                raise Exception("Error: MCP I2C driver cannot read data.")
-            else:
-                rsize = rbuff[MCP_I2C_RESPONSE_SIZE]
-                response += rbuff[MCP_I2C_DATA_START:MCP_I2C_DATA_START+rsize]
-        return bytearray(response)
+            rbuff = self.__readReport__()
+            if (rbuff[MCP_I2C_COMMAND] == MCP_COMMAND_WRITE_I2C_NO_STOP) & (rbuff[MCP_I2C_RESULT_ERROR] != MCP_COMMAND_OK):
+                self.__discardResponses__(1)
+                raise Exception("Error: MCP I2C driver cannot write register address.")
+            self.__checkReadResponse__(MCP_COMMAND_READ_I2C_REPEATED_START, size)
+            return self.__getReadData__(size)
 
     def writeBytes(self, data):
         size = len(data)
-        if size > MCP_MAX_TRANSFER_BYTES:
-            raise Exception("Error: MCP I2C driver can only write max %d bytes." % MCP_MAX_TRANSFER_BYTES)
-        debug("%s writeBytes size=%d" % (self.__str__(), size))
-
-        wbuff = bytearray(MCP_HID_REPORT_SIZE)
-        wbuff[MCP_I2C_COMMAND] = MCP_COMMAND_WRITE_I2C
-        wbuff[MCP_I2C_WRITE_SIZE] = size
-        wbuff[MCP_I2C_SLAVE_ADDR] = (self.slave << 1)
-        for i in range(size):
-            wbuff[i+MCP_I2C_DATA_START] = data[i]
-
-        self.write(wbuff)
-        rbuff = bytearray(self.read(MCP_HID_REPORT_SIZE))
-        if (rbuff[MCP_I2C_COMMAND] == MCP_COMMAND_WRITE_I2C) & (rbuff[MCP_I2C_RESULT_ERROR] != MCP_COMMAND_OK):
-            raise Exception("Error: MCP I2C driver cannot write data.")
+        if size > MCP_MAX_I2C_TRANSFER_BYTES:
+            raise Exception("Error: MCP I2C driver can only write max %d bytes." % MCP_MAX_I2C_TRANSFER_BYTES)
+        if debugEnabled():
+            debug("%s writeBytes size=%d" % (self.__str__(), size))
+
+        with self.adapter.lock:
+            wbuff = self.__newReport__(MCP_COMMAND_WRITE_I2C)
+            wbuff[MCP_I2C_WRITE_SIZE] = size & 0xFF
+            wbuff[MCP_I2C_WRITE_SIZE_HIGH] = (size >> 8) & 0xFF
+            wbuff[MCP_I2C_SLAVE_ADDR] = (self.slave << 1)
+
+            offset = 0
+            while True:
+                chunk = min(MCP_MAX_TRANSFER_BYTES, size - offset)
+                wbuff[MCP_I2C_DATA_START:MCP_I2C_DATA_START+chunk] = data[offset:offset+chunk]
+                retries = 0
+                while True:
+                    self.write(wbuff)
+                    rbuff = self.__readReport__()
+                    if (rbuff[MCP_I2C_COMMAND] == MCP_COMMAND_WRITE_I2C) & (rbuff[MCP_I2C_RESULT_ERROR] == MCP_I2C_ENGINE_BUSY) & (retries < MCP_MAX_RETRIES):
+                        retries += 1
+                        continue
+                    break
+                if (rbuff[MCP_I2C_COMMAND] == MCP_COMMAND_WRITE_I2C) & (rbuff[MCP_I2C_RESULT_ERROR] != MCP_COMMAND_OK):
+                    raise Exception("Error: MCP I2C driver cannot write data.")
+                offset += chunk
+                if offset >= size:
+                    break
+
+#---------- HID report helpers, to be used while holding the adapter lock ----------
+
+    def __newReport__(self, command):
+        wbuff = self.adapter.wbuff
+        wbuff[:] = MCP_EMPTY_REPORT
+        wbuff[MCP_I2C_COMMAND] = command
+        return wbuff
+
+    def __readReport__(self):
+        rbuff = self.adapter.rbuff
+        if hasattr(os, "readv"):
+            os.readv(self.fd, [rbuff])
+        else:
+            data = self.read(MCP_HID_REPORT_SIZE)
+            rbuff[:len(data)] = data
+        return rbuff
+
+    def __readRequest__(self, command, size):
+        wbuff = self.__newReport__(command)
+        wbuff[MCP_I2C_READ_SIZE] = size & 0xFF
+        wbuff[MCP_I2C_READ_SIZE_HIGH] = (size >> 8) & 0xFF
+        wbuff[MCP_I2C_SLAVE_ADDR] = (self.slave << 1) + 1
+        return wbuff
+
+    def __checkReadResponse__(self, command, size):
+        retries = 0
+        while True:
+            rbuff = self.__readReport__()
+            if (rbuff[MCP_I2C_COMMAND] != command) or (rbuff[MCP_I2C_RESULT_ERROR] == MCP_COMMAND_OK):
+                return
+            if rbuff[MCP_I2C_RESULT_ERROR] != MCP_I2C_ENGINE_BUSY:
+                raise Exception("Error: MCP I2C driver cannot request read data.")
+            if retries >= MCP_MAX_RETRIES:
+                self.resetI2CTransfer()
+                raise Exception("Error: MCP I2C driver cannot request read data, I2C engine busy.")
+            retries += 1
+            self.write(self.__readRequest__(command, size))
+
+    def __getReadData__(self, size):
+        response = bytearray(size)
+        received = 0
+        outstanding = 0
+        depth = MCP_GET_DATA_PIPELINE_DEPTH
+        retries = 0
+        wbuff = self.__newReport__(MCP_COMMAND_GET_READ_DATA_I2C)
+        while received < size:
+            # keep up to depth get data reports in flight
+            needed = (size - received + MCP_MAX_TRANSFER_BYTES - 1) // MCP_MAX_TRANSFER_BYTES
+            while outstanding < min(needed, depth):
+                self.write(wbuff)
+                outstanding += 1
+
+            rbuff = self.__readReport__()
+            outstanding -= 1
+            if debugEnabled():
+                debug("%s get_i2c_data_received: 0x%02X, 0x%02X, 0x%02X, got=%d, [0x%02X, 0x%02X, 0x%02X, 0x%02X]" % (self.__str__(),rbuff[0],rbuff[1],rbuff[2],rbuff[3],rbuff[4],rbuff[5],rbuff[6],rbuff[7]))
+            rsize = rbuff[MCP_I2C_RESPONSE_SIZE]
+            if rsize == MCP_I2C_READ_ERROR_SIZE:
+                self.__discardResponses__(outstanding)
+                raise Exception("Error: MCP I2C driver cannot read data.")
+            if (rbuff[MCP_I2C_COMMAND] == MCP_COMMAND_GET_READ_DATA_I2C) & (rbuff[MCP_I2C_RESULT_ERROR] != MCP_COMMAND_OK):
+                rsize = 0
+            if rsize == 0:
+                # data not ready yet, ask again with only one get data report in flight
+                depth = 1
+                retries += 1
+                if retries > MCP_MAX_RETRIES:
+                    self.__discardResponses__(outstanding)
+                    raise Exception("Error: MCP I2C driver did not receive read data.")
+                continue
+            retries = 0
+            rsize = min(rsize, size - received)
+            response[received:received+rsize] = rbuff[MCP_I2C_DATA_START:MCP_I2C_DATA_START+rsize]
+            received += rsize
+        self.__discardResponses__(outstanding)
+        return response
+
+    def __discardResponses__(self, count):
+        for i in range(count):
+            self.__readReport__()
 
     def resetI2CTransfer(self):
-        wbuff = bytearray(MCP_HID_REPORT_SIZE)
-        wbuff[MCP_I2C_COMMAND] = MCP_COMMAND_STATUS
+        wbuff = self.__newReport__(MCP_COMMAND_STATUS)
         wbuff[MCP_I2C_CANCEL_SUBCOMMAND] = MCP_SUB_COMMAND_CANCEL_I2C
 
         self.write(wbuff)
 
-        rbuff = bytearray(self.read(MCP_HID_REPORT_SIZE))
+        rbuff = self.__readReport__()
 
         if (rbuff[MCP_I2C_COMMAND] == MCP_COMMAND_STATUS) & (rbuff[MCP_I2C_RESULT_ERROR] != MCP_COMMAND_OK):
             raise Exception("Error: MCP I2C driver cannot reset I2C transfer.")
         debug("Resetted I2C bus transfer - I2C_MCP2221_HIDRAW(dev=%s)"  % self.device)
 
     def setI2CBusSpeed(self, divider):
-        wbuff = bytearray(MCP_HID_REPORT_SIZE)
-        wbuff[MCP_I2C_COMMAND] = MCP_COMMAND_STATUS
+        wbuff = self.__newReport__(MCP_COMMAND_STATUS)
         wbuff[MCP_I2C_SET_I2C_SPEED] = MCP_SUB_COMMAND_SET_I2C_SPEED
         wbuff[MCP_I2C_NEW_I2C_CLOCK_DIVIDER] = divider
 
         self.write(wbuff)
 
-        rbuff = bytearray(self.read(MCP_HID_REPORT_SIZE))
-        debug("I2C_MCP2221_HIDRAW(dev=%s) status_received: 0x%02X, 0x%02X, cancel=%d, speedstate=0x%02X, newdiv=%s, currdiv=%s, currto=%s" % (self.device,rbuff[0],rbuff[1],rbuff[2],rbuff[3],rbuff[4],rbuff[14],rbuff[15]))
+        rbuff = self.__readReport__()
+        if debugEnabled():
+            debug("I2C_MCP2221_HIDRAW(dev=%s) status_received: 0x%02X, 0x%02X, cancel=%d, speedstate=0x%02X, newdiv=%s, currdiv=%s, currto=%s" % (self.device,rbuff[0],rbuff[1],rbuff[2],rbuff[3],rbuff[4],rbuff[14],rbuff[15]))
 
         if (rbuff[MCP_I2C_COMMAND] == MCP_COMMAND_STATUS) & (rbuff[MCP_I2C_RESULT_ERROR] != MCP_COMMAND_OK):
             raise Exception("Error: MCP I2C driver cannot set I2C speed.")
@@ -245,13 +383,13 @@ class I2C_MCP2221_HIDRAW(I2C_Bus):
 #---------- MCP2210 HID communication debugging helper methods ----------
 
     def getStatus(self):
-        wbuff = bytearray(MCP_HID_REPORT_SIZE)
-        wbuff[MCP_I2C_COMMAND] = MCP_COMMAND_STATUS
+        wbuff = self.__newReport__(MCP_COMMAND_STATUS)
 
         self.write(wbuff)
 
-        rbuff = bytearray(self.read(MCP_HID_REPORT_SIZE))
-        debug("I2C_MCP2221_HIDRAW(dev=%s) status_received: 0x%02X, 0x%02X, cancel=%d, speedst=0x%02X, ndiv=%s, i2cst=0x%02X, lbr=0x%02X, hbr=0x%02X, lbs=0x%02X, hbs=0x%02X, cnt=%d, cdiv=%s, cto=%s, lba=0x%02X, hba=0x%02X, pend=%d"  %
-              (self.device,rbuff[0],rbuff[1],rbuff[2],rbuff[3],rbuff[4],rbuff[8],rbuff[9],rbuff[10],rbuff[11],rbuff[12],rbuff[13],rbuff[14],rbuff[15],rbuff[16],rbuff[17],rbuff[25]))
+        rbuff = self.__readReport__()
+        if debugEnabled():
+            debug("I2C_MCP2221_HIDRAW(dev=%s) status_received: 0x%02X, 0x%02X, cancel=%d, speedst=0x%02X, ndiv=%s, i2cst=0x%02X, lbr=0x%02X, hbr=0x%02X, lbs=0x%02X, hbs=0x%02X, cnt=%d, cdiv=%s, cto=%s, lba=0x%02X, hba=0x%02X, pend=%d"  %
+                  (self.device,rbuff[0],rbuff[1],rbuff[2],rbuff[3],rbuff[4],rbuff[8],rbuff[9],rbuff[10],rbuff[11],rbuff[12],rbuff[13],rbuff[14],rbuff[15],rbuff[16],rbuff[17],rbuff[25]))
 
 
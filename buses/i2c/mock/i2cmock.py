@@ -20,6 +20,11 @@
 #   1.1    2016-06-22    Added support for bus selection.
 #   1.2    2016-07-28    Added compatibility with slave address detect feature from WebIOPi 0.7.22
 #   1.3    2016-08-29    Make all results consistent to be bytearrays.
+#   1.4    2026-10-17    Built-in register file backend, timing model and
+#                        transaction().
+#   1.5    2026-10-17    Register file selected by the current slave address.
+#   1.6    2026-10-17    Shared transaction helpers of i2cmessage.
+#   1.7    2026-10-17    Register file accesses secured by a lock per register file.
 #
 #   Implementation and usage remarks
 #
@@ -33,27 +38,119 @@
 #   enough bytes to allow accessing the highest register address used for
 #   requests.
 #
+#   Alternatively, a built-in register file can be used by setting the registers:
+#   parameter to the number of registers, e.g. registers:256. No memory device is
+#   needed then. Each slave on each <dev> has its own register file, all I2C_MOCK
+#   instances for the same <dev> and slave share it. Like most real I2C chips, the
+#   register file has a register pointer: writeBytes() sets it to the first byte
+#   and writes the remaining bytes, readBytes() reads from it and both increment it.
+#   Each register file has its own lock that secures the register pointer and the
+#   contents for each read and write, as instances of several threads (e.g. one
+#   per REST request) may share it.
+#   registerFile() returns the register file, e.g. for preloading test data via
+#   its view attribute (a memoryview). transaction() (see I2C_DEV) can address all
+#   slaves on the same <dev> that have a register file. Like I2C_DEV, the register
+#   file is selected by the current slave address of the instance, so an instance
+#   shared via the auxiliary bus pool (e.g. by I2C_MUX or the bus wrappers) serves
+#   the slave address set by its user.
+#
+#   Optionally, the timing of a real I2C bus can be simulated (see MockTiming):
+#
+#   - clock:    bus clock in Hz, e.g. 100000 or 400000 (0 = no bus clock timing)
+#   - latency:  seconds per transaction, e.g. for the driver overhead of a real bus
+#   - stretch:  seconds of clock stretching per byte
+#
+#   All slaves on the same <dev> share one simulated bus, the parameters of the
+#   first I2C_MOCK instance for a <dev> are used. Example:
+#
+#   [BUSES]
+#   i2cmock = I2C_MOCK dev:mockbus registers:256 clock:400000 latency:0.00005
+#
 
 import webiopi
 from webiopi.devices.bus import Bus, I2C_Bus
+from webiopi.devices.buses.i2cmessage import sequentialTransaction, transactionSize
+from webiopi.devices.buses.mocktiming import MockTiming
+from webiopi.utils.types import toint
 from webiopi.utils.logger import debug, info
+from threading import Lock
+
+I2C_MOCK_BITS_PER_BYTE = 9  # 8 data bits and ACK
+I2C_MOCK_OVERHEAD_BITS = 11 # START, address byte with ACK and STOP
+
+#Built-in register files per (dev, slave) and timing models per dev
+REGISTER_FILES = {}
+TIMINGS = {}
+MOCKLOCK = Lock()
+
+
+class I2C_RegisterFile():
+    def __init__(self, size):
+        self.size = size
+        self.data = bytearray(size)
+        self.view = memoryview(self.data)
+        self.pointer = 0
+        self.lock = Lock()
+
+    def __str__(self):
+        return "I2C_RegisterFile(size=%d)" % self.size
+
+    def read(self, addr, count):
+        with self.lock:
+            return self.__read__(addr, count)
+
+    def readNext(self, count):
+        with self.lock:
+            return self.__read__(self.pointer, count)
+
+    def write(self, addr, data):
+        count = len(data)
+        with self.lock:
+            self.__checkRange__(addr, count)
+            self.data[addr:addr+count] = data
+            self.pointer = addr + count
+
+    def __read__(self, addr, count):
+        self.__checkRange__(addr, count)
+        self.pointer = addr + count
+        return bytearray(self.view[addr:addr+count])
+
+    def __checkRange__(self, addr, count):
+        if (addr < 0) or (addr + count > self.size):
+            raise ValueError("Register address 0x%02X with count %d out of range [0..%d]" % (addr, count, self.size - 1))
 
 
 class I2C_MOCK(I2C_Bus):
-    def __init__(self, dev="", slave=0x00):
+    def __init__(self, dev="", slave=0x00, registers=0, clock=0, latency=0, stretch=0):
         Bus.__init__(self, "I2C", "mock:%s" % dev)
         I2C_Bus.__init__(self, slave)
-        
-        mockMemoryName = "%s" % dev
-        self._memory = webiopi.deviceInstance(mockMemoryName)
+        self.dev = dev
+        self.registerCount = toint(registers)
+
+        if self.registerCount > 0:
+            self._registers = self.__registerFile__(toint(slave))
+            self._registersSlave = self.slave
+            self._memory = None
+        else:
+            self._registers = None
+            mockMemoryName = "%s" % dev
+            self._memory = webiopi.deviceInstance(mockMemoryName)
         self._hasMock = self._memory != None
-        
+
+        self._timing = self.__timing__(toint(clock), float(latency), float(stretch))
+
         debug("Mapped I2C bus device - %s" % self.__str__())
 
 
     def __str__(self):
         return "%s (dev=%s)" % (self.__class__.__name__, self.device)
 
+    def registerFile(self):
+        return self._registers
+
+    def timing(self):
+        return self._timing
+
 #---------- Bus abstraction methods reimplementation ----------
     
     def open(self):
@@ -66,31 +163,116 @@ class I2C_MOCK(I2C_Bus):
 #---------- I2C abstraction communication methods redirected to reading/writing simulation memory ----------
     
     def readBytes(self, size=1):
+        if self._timing is not None:
+            self._timing.transfer(size)
+        if self._registers is not None:
+            registers = self.__slaveRegisterFile__()
+            return registers.readNext(size)
         if self._hasMock:
             return bytearray(self._memory.readMemoryBytes(0, size))
         else:
             return bytearray(size)
 
     def writeBytes(self, data):
-        if self._hasMock:
+        if self._timing is not None:
+            self._timing.transfer(len(data))
+        if self._registers is not None:
+            self.__writeRegisterFile__(self.__slaveRegisterFile__(), data)
+        elif self._hasMock:
             self._memory.writeMemoryBytes(0, bytearray(data))
 
     def readRegister(self, addr):
+        if self._timing is not None:
+            self._timing.transfer(2, 2)
+        if self._registers is not None:
+            return self.__slaveRegisterFile__().read(addr, 1)[0]
         if self._hasMock:
             return self._memory.readMemoryByte(addr)
         else:
             return 0
 
     def readRegisters(self, addr, count):
+        if self._timing is not None:
+            self._timing.transfer(count + 1, 2)
+        if self._registers is not None:
+            return self.__slaveRegisterFile__().read(addr, count)
         if self._hasMock:
             return bytearray(self._memory.readMemoryBytes(addr, addr + count))
         else:
             return bytearray(count)
 
     def writeRegister(self, addr, byte):
-        if self._hasMock:
+        if self._timing is not None:
+            self._timing.transfer(2)
+        if self._registers is not None:
+            self.__slaveRegisterFile__().write(addr, [byte])
+        elif self._hasMock:
             self._memory.writeMemoryByte(addr, byte)
 
     def writeRegisters(self, addr, buff):
-        if self._hasMock:
+        if self._timing is not None:
+            self._timing.transfer(len(buff) + 1)
+        if self._registers is not None:
+            self.__slaveRegisterFile__().write(addr, buff)
+        elif self._hasMock:
             self._memory.writeMemoryBytes(addr, buff)
+
+#---------- Batched multi-message transactions ----------
+
+    def transaction(self, messages):
+        if self._registers is None:
+            return self.__sequentialTransaction__(messages)
+        if self._timing is not None:
+            self._timing.transfer(transactionSize(messages), len(messages))
+        results = []
+        for message in messages:
+            registers = self.__slaveRegisterFile__()
+            if message.slave is not None:
+                registers = self.__existingRegisterFile__(message.slave)
+            if message.isRead():
+                results.append(registers.readNext(message.size))
+            else:
+                self.__writeRegisterFile__(registers, message.data)
+                results.append(None)
+        return results
+
+#---------- Helpers ----------
+
+    def __registerFile__(self, slave):
+        with MOCKLOCK:
+            registers = REGISTER_FILES.get((self.dev, slave))
+            if registers is None:
+                registers = I2C_RegisterFile(self.registerCount)
+                REGISTER_FILES[(self.dev, slave)] = registers
+            return registers
+
+    def __slaveRegisterFile__(self):
+        if self.slave == self._registersSlave:
+            return self._registers
+        return self.__registerFile__(toint(self.slave))
+
+    def __existingRegisterFile__(self, slave):
+        registers = REGISTER_FILES.get((self.dev, slave))
+        if registers is None:
+            raise Exception("Error: %s has no register file for slave 0x%02X" % (self.__str__(), slave))
+        return registers
+
+    def __writeRegisterFile__(self, registers, data):
+        if len(data) > 0:
+            registers.write(data[0], data[1:])
+
+    def __timing__(self, clock, latency, stretch):
+        with MOCKLOCK:
+            timing = TIMINGS.get(self.dev)
+            if timing is None:
+                timing = MockTiming(clock, I2C_MOCK_BITS_PER_BYTE, I2C_MOCK_OVERHEAD_BITS, latency, stretch)
+                TIMINGS[self.dev] = timing
+        if not timing.isEnabled():
+            return None
+        return timing
+
+    def __sequentialTransaction__(self, messages):
+        for message in messages:
+            if (message.slave is not None) and (message.slave != self.slave):
+                raise Exception("Error: %s can only address other slaves with a register file" % self.__str__())
+        return sequentialTransaction(self, messages)
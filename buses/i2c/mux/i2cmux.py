@@ -0,0 +1,214 @@
+#   Copyright 2026 Andreas Riegg - t-h-i-n-x.net
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+#   ----------------------------------------------------------------------------
+#
+#   Changelog
+#
+#   1.0    2026-10-17    Initial release.
+#
+#   1.1    2026-10-17    Channels of batch transactions are checked before the
+#                        bus is used.
+#
+#   1.2    2026-10-17    Upstream transactions via the shared busTransaction().
+#
+#   1.3    2026-10-17    Lock of the pooled upstream bus used as multiplexer lock.
+#
+#   Implementation and usage remarks
+#
+#   Implements I2C device connectivity behind TCA9548A/PCA9548A style I2C
+#   multiplexers. Each downstream channel of a multiplexer is used as a normal
+#   I2C bus device, so several chips with the same fixed slave address can be
+#   used via different channels. The communication scheme is like this:
+#   HW <-> Mux channel <-> Mux <-> AuxiliaryBus (upstream I2C) <-> I2C_MUX <-> WebIOPi devices.
+#
+#   In order to work, the upstream I2C bus device has to be declared in the [BUSES]
+#   section BEFORE the declaration of the I2C_MUX bus devices and has to be provided
+#   via the name of that I2C bus device as dev: parameter. The slave address of the
+#   multiplexer is given via the mux: parameter (default 0x70), the downstream channel
+#   via the channel: parameter (0..7).
+#
+#   Example:
+#   [BUSES]
+#   i2c1 = I2C_DEV dev:i2c-1
+#   mux0 = I2C_MUX dev:i2c1 mux:0x70 channel:0
+#   mux1 = I2C_MUX dev:i2c1 mux:0x70 channel:1
+#
+#   [DEVICES]
+#   bmp0 = BMP085 bus:mux0
+#   bmp1 = BMP085 bus:mux1
+#
+#   The currently selected channel of each multiplexer is cached, the channel select
+#   write is only sent when another channel is accessed. Multiplexers on the same
+#   upstream bus are switched off before another one is switched on, so chips with
+#   the same slave address behind different multiplexers do not collide. A failed
+#   access discards the cached selection of the multiplexer.
+#
+#   Downstream transfers use transaction() of the upstream bus (see I2C_DEV) with
+#   the slave address set per message. For upstream buses without transaction()
+#   (e.g. MCP2221, USB-ISS) the slave address of the upstream bus is switched
+#   while holding the multiplexer lock.
+#
+#   The multiplexer lock is the lock of the pooled upstream bus (see AuxiliaryBus),
+#   so channel selection and downstream transfers are serialized with all other
+#   layered buses that use the same upstream bus (e.g. recorders or monitors).
+#
+#   batchTransactions() executes a list of (channel, messages) requests grouped by
+#   channel, starting with the currently selected one, so each channel is selected
+#   only once per batch. Each request is executed as one transaction of its own.
+#   All channels are checked before the first request is executed, so a batch with
+#   an invalid channel raises a ValueError without any transfer on the bus.
+#   The results are returned in the order of the requests. Example:
+#
+#   results = mux0.batchTransactions([(0, [I2C_Message(data=[0xF6], slave=0x77), I2C_Message(size=2, slave=0x77)]),
+#                                     (1, [I2C_Message(data=[0xF6], slave=0x77), I2C_Message(size=2, slave=0x77)])])
+#
+
+from webiopi.devices.bus import Bus, I2C_Bus
+from webiopi.devices.buses.adapters import Adapter, AdapterRegistry
+from webiopi.devices.buses.auxiliary import AuxiliaryBus
+from webiopi.devices.buses.i2cmessage import I2C_Message, busTransaction
+from webiopi.utils.types import toint
+from webiopi.utils.logger import debug
+
+MUX_CHANNEL_COUNT  = 8
+MUX_DEFAULT_SLAVE  = 0x70
+MUX_NO_CHANNEL     = 0x00
+
+#Registry of multiplexers per upstream I2C bus
+MUXES = AdapterRegistry()
+
+
+class I2C_MUX(AuxiliaryBus, I2C_Bus):
+    def __init__(self, slave=0x00, dev="", mux=MUX_DEFAULT_SLAVE, channel=0):
+        self.slave = toint(slave)
+        self.upstreamName = dev
+        self.muxAddress = toint(mux)
+        self.channel = self.__checkChannel__(channel)
+
+        self.mux = MUXES.acquire(dev, self.__openMux__)
+        self.upstream = self.mux.bus
+        Bus.__init__(self, "I2C", "mux:%s:0x%02X:%d" % (dev, self.muxAddress, self.channel))
+        I2C_Bus.__init__(self, self.slave)
+        debug("Attached I2C bus device - %s" % self.__str__())
+
+    def __str__(self):
+        return "%s (slave=0x%02X dev=%s mux=0x%02X channel=%d)" % (self.__class__.__name__, self.slave, self.upstreamName, self.muxAddress, self.channel)
+
+#---------- BUS open() and close() reimplementation to handle the shared upstream bus ----------
+
+    def open(self):
+        debug("Opening I2C bus device - %s" % self.__str__())
+
+    def close(self):
+        debug("Closing I2C bus device - %s" % self.__str__())
+        I2C_Bus.close(self)
+        if self.mux is not None:
+            MUXES.release(self.upstreamName, self.__closeMux__)
+            self.mux = None
+            self.upstream = None
+
+#---------- Bus and I2C abstraction communication methods redirected to the selected channel ----------
+
+    def readBytes(self, size=1):
+        return self.transaction([I2C_Message(size=size)])[0]
+
+    def writeBytes(self, data):
+        self.transaction([I2C_Message(data=data)])
+
+    def readRegister(self, addr):
+        return self.readRegisters(addr, 1)[0]
+
+    def readRegisters(self, addr, count):
+        return self.transaction([I2C_Message(data=[addr]), I2C_Message(size=count)])[1]
+
+    def writeRegister(self, addr, byte):
+        self.writeRegisters(addr, bytearray([byte]))
+
+    def writeRegisters(self, addr, buff):
+        data = bytearray(len(buff) + 1)
+        data[0] = addr
+        data[1:] = buff
+        self.writeBytes(data)
+
+#---------- Transactions ----------
+
+    def transaction(self, messages):
+        with self.mux.lock:
+            return self.__channelTransaction__(self.channel, messages)
+
+    def batchTransactions(self, requests):
+        requests = [(self.__checkChannel__(channel), messages) for (channel, messages) in requests]
+        results = [None] * len(requests)
+        with self.mux.lock:
+            # requests for the currently selected channel first, then by channel
+            current = self.mux.selected.get(self.muxAddress, MUX_NO_CHANNEL)
+            order = sorted(range(len(requests)), key=lambda i: ((1 << requests[i][0]) != current, requests[i][0]))
+            for i in order:
+                (channel, messages) = requests[i]
+                results[i] = self.__channelTransaction__(channel, messages)
+        return results
+
+    def selectCount(self):
+        return self.mux.selects
+
+#---------- Helpers ----------
+
+    def __checkChannel__(self, channel):
+        channel = toint(channel)
+        if (channel < 0) or (channel >= MUX_CHANNEL_COUNT):
+            raise ValueError("Channel %d out of range [0..%d]" % (channel, MUX_CHANNEL_COUNT - 1))
+        return channel
+
+    def __openMux__(self, busName):
+        mux = Adapter(busName)
+        mux.bus = self.openAuxiliaryBus(busName, slave=self.muxAddress)
+        mux.lock = self.getAuxiliaryBusLock(busName)
+        mux.selected = {}
+        mux.selects = 0
+        return mux
+
+    def __closeMux__(self, mux):
+        self.closeAuxiliaryBus(mux.device)
+
+    def __channelTransaction__(self, channel, messages):
+        addressed = []
+        for message in messages:
+            if message.slave is None:
+                message = I2C_Message(message.data, message.size, self.slave)
+            addressed.append(message)
+        try:
+            self.__select__(channel)
+            return self.__upstreamTransaction__(addressed)
+        except Exception:
+            self.mux.selected.pop(self.muxAddress, None)
+            raise
+
+    def __select__(self, channel):
+        mask = 1 << channel
+        selected = self.mux.selected
+        if selected.get(self.muxAddress) == mask:
+            return
+        for address in list(selected.keys()):
+            if (address != self.muxAddress) and (selected[address] != MUX_NO_CHANNEL):
+                del selected[address]
+                self.__upstreamTransaction__([I2C_Message(data=[MUX_NO_CHANNEL], slave=address)])
+                selected[address] = MUX_NO_CHANNEL
+        selected.pop(self.muxAddress, None)
+        self.__upstreamTransaction__([I2C_Message(data=[mask], slave=self.muxAddress)])
+        selected[self.muxAddress] = mask
+        self.mux.selects += 1
+
+    def __upstreamTransaction__(self, messages):
+        return busTransaction(self.upstream, messages)
@@ -0,0 +1,174 @@
+#   Copyright 2026 Andreas Riegg - t-h-i-n-x.net
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+#   ----------------------------------------------------------------------------
+#
+#   Changelog
+#
+#   1.0    2026-10-17    Initial release.
+#
+#   1.1    2026-10-17    Monitored buses shared via the auxiliary bus pool, bus
+#                        parameters passed to the monitored bus (see buswrapper).
+#
+#   1.2    2026-10-17    Transactions accounted per addressed slave.
+#
+#   Implementation and usage remarks
+#
+#   Implements traffic statistics (see busstatistics) for any I2C, SPI or UART
+#   bus device. The communication scheme is like this:
+#   HW <-> Bus device (e.g. I2C_DEV) <-> AuxiliaryBus <-> XXX_MONITOR <-> WebIOPi devices.
+#
+#   In order to work, the monitored bus device has to be declared in the [BUSES]
+#   section BEFORE the declaration of the monitor bus device and has to be
+#   provided via the name of that bus device as dev: parameter. All monitors and
+#   other layered buses with the same dev: parameter share one instance of the
+#   monitored bus device (see buswrapper). The statistics are collected per name
+#   of the monitored bus device and per slave address, so all devices using
+#   monitors with the same dev: parameter are accounted to the same bus.
+#
+#   Only traffic through the monitors is counted: bus devices do not collect
+#   statistics themselves, so devices that use the monitored bus device directly
+#   (or via other layered buses) do not show up in the statistics.
+#
+#   Example:
+#   [BUSES]
+#   i2c1 = I2C_DEV dev:i2c-1
+#   mon1 = I2C_MONITOR dev:i2c1
+#
+#   [DEVICES]
+#   bmp = BMP085 bus:mon1
+#   tmp = TMP102 bus:mon1
+#   busstats = BUS_STATISTICS
+#
+#   I2C transactions are accounted to the slaves addressed by their messages: each
+#   slave counts one transaction with the bytes of its messages and the part of the
+#   duration that corresponds to its share of the bytes.
+#
+#   available() of UART buses is passed through without being counted.
+#
+
+from webiopi.devices.bus import Bus, I2C_Bus
+from webiopi.devices.buses.buswrapper import I2C_WRAPPER, SPI_WRAPPER, UART_WRAPPER
+from webiopi.devices.buses.buswrapper import OP_READ_BYTES, OP_WRITE_BYTES, OP_READ_REGISTER, OP_READ_REGISTERS, OP_WRITE_REGISTER, OP_WRITE_REGISTERS
+from webiopi.devices.buses.buswrapper import OP_TRANSACTION, OP_XFER, OP_READ, OP_WRITE, OP_READ_STRING, OP_WRITE_STRING
+from webiopi.devices.buses.busstatistics import busStatistics, STATISTICS_READ, STATISTICS_WRITE, STATISTICS_XFER, STATISTICS_TRANSACTION
+from webiopi.devices.buses.i2cmessage import transactionSize
+from webiopi.utils.logger import debug
+import time
+
+monotonic = getattr(time, "monotonic", time.time)
+
+#Statistics kind per monitored method, methods without kind are not counted
+MONITOR_KINDS = {
+    OP_READ_BYTES:      STATISTICS_READ,
+    OP_READ_REGISTER:   STATISTICS_READ,
+    OP_READ_REGISTERS:  STATISTICS_READ,
+    OP_READ:            STATISTICS_READ,
+    OP_READ_STRING:     STATISTICS_READ,
+    OP_WRITE_BYTES:     STATISTICS_WRITE,
+    OP_WRITE_REGISTER:  STATISTICS_WRITE,
+    OP_WRITE_REGISTERS: STATISTICS_WRITE,
+    OP_WRITE:           STATISTICS_WRITE,
+    OP_WRITE_STRING:    STATISTICS_WRITE,
+    OP_XFER:            STATISTICS_XFER,
+    OP_TRANSACTION:     STATISTICS_TRANSACTION,
+}
+
+
+#---------- Monitor abstract class ----------
+
+class XXX_MONITOR():
+    def __init__(self):
+        self.statistics = busStatistics(self.upstreamName, self.wrappedSlave)
+        self.slaveStatistics = {self.wrappedSlave: self.statistics}
+
+    def __str__(self):
+        return "%s (dev=%s)" % (self.__class__.__name__, self.upstreamName)
+
+#---------- Helpers ----------
+
+    def __wrap__(self, op, addr, tx, size, function, *args):
+        kind = MONITOR_KINDS.get(op)
+        if kind is None:
+            return function(*args)
+        start = monotonic()
+        try:
+            result = function(*args)
+        except Exception:
+            if op == OP_TRANSACTION:
+                self.__addTransaction__(tx, monotonic() - start, True)
+            else:
+                self.statistics.add(kind, 0, monotonic() - start, True)
+            raise
+        if op == OP_TRANSACTION:
+            self.__addTransaction__(tx, monotonic() - start)
+            return result
+        if size is None:
+            size = len(result)
+        self.statistics.add(kind, size, monotonic() - start)
+        return result
+
+    def __addTransaction__(self, messages, duration, error=False):
+        slaves = []
+        sizes = {}
+        for message in messages:
+            if message.slave not in sizes:
+                slaves.append(message.slave)
+                sizes[message.slave] = 0
+            sizes[message.slave] += transactionSize([message])
+        total = sum(sizes.values())
+        for slave in slaves:
+            if total > 0:
+                share = duration * sizes[slave] / total
+            else:
+                share = duration / len(slaves)
+            self.__slaveStatistics__(slave).add(STATISTICS_TRANSACTION, 0 if error else sizes[slave], share, error)
+
+    def __slaveStatistics__(self, slave):
+        statistics = self.slaveStatistics.get(slave)
+        if statistics is None:
+            statistics = busStatistics(self.upstreamName, slave)
+            self.slaveStatistics[slave] = statistics
+        return statistics
+
+
+#---------- I2C monitor ----------
+
+class I2C_MONITOR(XXX_MONITOR, I2C_WRAPPER):
+    def __init__(self, slave=0x00, dev=""):
+        I2C_WRAPPER.__init__(self, slave, dev)
+        XXX_MONITOR.__init__(self)
+        Bus.__init__(self, "I2C", "monitor:%s" % dev)
+        I2C_Bus.__init__(self, self.slave)
+        debug("Attached I2C bus device - %s" % self.__str__())
+
+
+#---------- SPI monitor ----------
+
+class SPI_MONITOR(XXX_MONITOR, SPI_WRAPPER):
+    def __init__(self, chip=None, mode=None, bits=None, speed=None, dev=""):
+        SPI_WRAPPER.__init__(self, chip, mode, bits, speed, dev)
+        XXX_MONITOR.__init__(self)
+        Bus.__init__(self, "SPI", "monitor:%s" % dev)
+        debug("Attached SPI bus device - %s" % self.__str__())
+
+
+#---------- UART monitor ----------
+
+class UART_MONITOR(XXX_MONITOR, UART_WRAPPER):
+    def __init__(self, baudrate=None, dev=""):
+        UART_WRAPPER.__init__(self, baudrate, dev)
+        XXX_MONITOR.__init__(self)
+        Bus.__init__(self, "UART", "monitor:%s" % dev, None)
+        debug("Attached UART bus device - %s" % self.__str__())
@@ -0,0 +1,421 @@
+#   Copyright 2026 Andreas Riegg - t-h-i-n-x.net
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+#   ----------------------------------------------------------------------------
+#
+#   Changelog
+#
+#   1.0    2026-10-17    Initial release.
+#
+#   1.1    2026-10-17    Recorded buses shared via the auxiliary bus pool, bus
+#                        parameters passed to the recorded bus (see buswrapper).
+#
+#   1.2    2026-10-17    Replayed records converted via tobytes() for Python 2.
+#
+#   Implementation and usage remarks
+#
+#   Implements recording of the traffic of any I2C, SPI or UART bus device to a
+#   file and the replay of recorded traffic without hardware. The communication
+#   scheme is like this:
+#   HW <-> Bus device (e.g. I2C_DEV) <-> AuxiliaryBus <-> XXX_RECORDER <-> WebIOPi devices.
+#   Recording file <-> XXX_REPLAY <-> WebIOPi devices.
+#
+#   In order to record, the recorded bus device has to be declared in the [BUSES]
+#   section BEFORE the declaration of the recorder bus device and has to be
+#   provided via the name of that bus device as dev: parameter. All recorders and
+#   other layered buses with the same dev: parameter share one instance of the
+#   recorded bus device (see buswrapper). The recording file is given via the
+#   file: parameter.
+#   Several recorders can write to the same file, the records are kept in the
+#   order of the calls.
+#
+#   Example:
+#   [BUSES]
+#   i2c1 = I2C_DEV dev:i2c-1
+#   rec1 = I2C_RECORDER dev:i2c1 file:/var/log/webiopi/i2c1.rec
+#
+#   [DEVICES]
+#   bmp = BMP085 bus:rec1
+#
+#   Replay of the same traffic without hardware:
+#   [BUSES]
+#   rec1 = I2C_REPLAY file:/var/log/webiopi/i2c1.rec timing:recorded
+#
+#   Each call of a bus method is served by the next record of the file. The
+#   replay raises an exception if the call does not match the recorded method or
+#   slave address or if the file has no more records. Differing register
+#   addresses or written data are only counted (see mismatches()). remaining()
+#   returns the number of records not replayed yet. Calls that raised an error
+#   while recording raise an error with the same message.
+#   With timing:recorded, each response is returned at the time it was received
+#   while recording (relative to the first replayed call), with timing:fast
+#   (default) as fast as possible. All replay bus devices with the same file
+#   share one replay position.
+#
+#   File format: The file is append-only. Each opening by a recorder appends a
+#   session header (marker 0x00, "WBT", version, wall clock time as double). Each
+#   call appends a record header (method code, slave, register address, start
+#   time and duration in microseconds on the monotonic clock relative to the
+#   session start, number of written and read bytes) followed by the written and
+#   the read bytes. All values are little endian. Integer results (e.g. of
+#   readRegister() or available()) are stored as 4 bytes.
+#   I2C transactions (see I2C_DEV) are stored in one record, the written bytes
+#   hold per message slave, direction and size (plus data for writes), the read
+#   bytes hold the results of all read messages.
+#
+
+from webiopi.devices.bus import Bus, I2C_Bus, SPI_Bus, UART_Bus
+from webiopi.devices.buses.adapters import Adapter, AdapterRegistry
+from webiopi.devices.buses.buswrapper import I2C_WRAPPER, SPI_WRAPPER, UART_WRAPPER
+from webiopi.devices.buses.buswrapper import OP_READ_BYTES, OP_WRITE_BYTES, OP_READ_REGISTER, OP_READ_REGISTERS, OP_WRITE_REGISTER, OP_WRITE_REGISTERS
+from webiopi.devices.buses.buswrapper import OP_TRANSACTION, OP_XFER, OP_READ, OP_WRITE, OP_READ_STRING, OP_WRITE_STRING, OP_AVAILABLE
+from webiopi.devices.buses.i2cmessage import I2C_Message
+from webiopi.utils.types import toint
+from webiopi.utils.logger import debug
+from webiopi.utils.version import PYTHON_MAJOR
+import struct
+import time
+
+monotonic = getattr(time, "monotonic", time.time)
+
+RECORD_VERSION           = 1
+RECORD_SESSION_MARKER    = 0x00
+RECORD_SESSION           = struct.Struct("<B3sBd")
+RECORD_HEADER            = struct.Struct("<BBHQIII")
+RECORD_INT               = struct.Struct("<I")
+RECORD_MESSAGE           = struct.Struct("<BBH")
+
+OP_ERROR                 = 0x80
+
+REPLAY_TIMING_FAST       = "fast"
+REPLAY_TIMING_RECORDED   = "recorded"
+
+#Registries of opened recording files and loaded replay files
+RECORDINGS = AdapterRegistry()
+REPLAYS = AdapterRegistry()
+
+
+def toRecordBytes(value):
+    if value is None:
+        return b""
+    if isinstance(value, (bytes, bytearray)):
+        return value
+    if isinstance(value, int):
+        return RECORD_INT.pack(value)
+    if isinstance(value, list) and (len(value) > 0) and not isinstance(value[0], int):
+        # results of an I2C transaction
+        data = bytearray()
+        for result in value:
+            if result is not None:
+                data += result
+        return data
+    if hasattr(value, "encode"):
+        return value.encode("latin-1")
+    return bytearray(value)
+
+
+#---------- Recorder abstract class ----------
+
+class XXX_RECORDER():
+    def __init__(self, file):
+        self.file = file
+        self.recording = RECORDINGS.acquire(file, self.__openRecording__)
+
+    def __str__(self):
+        return "%s (dev=%s file=%s)" % (self.__class__.__name__, self.upstreamName, self.file)
+
+    def closeRecorder(self):
+        if self.recording is not None:
+            RECORDINGS.release(self.file, self.__closeRecording__)
+            self.recording = None
+
+#---------- Helpers ----------
+
+    def __wrap__(self, op, addr, tx, size, function, *args):
+        slave = self.wrappedSlave
+        if slave is None:
+            slave = 0
+        if op == OP_TRANSACTION:
+            tx = encodeMessages(tx)
+        start = monotonic()
+        try:
+            result = function(*args)
+        except Exception as e:
+            self.__writeRecord__(op | OP_ERROR, slave, addr, tx, str(e).encode("utf-8"), start, monotonic())
+            raise
+        self.__writeRecord__(op, slave, addr, tx, toRecordBytes(result), start, monotonic())
+        return result
+
+    def __writeRecord__(self, op, slave, addr, tx, rx, start, end):
+        recording = self.recording
+        tx = toRecordBytes(tx)
+        with recording.lock:
+            recording.file.write(RECORD_HEADER.pack(op, slave, addr,
+                                                    int((start - recording.start) * 1000000),
+                                                    int((end - start) * 1000000),
+                                                    len(tx), len(rx)))
+            recording.file.write(tx)
+            recording.file.write(rx)
+            recording.file.flush()
+            recording.records += 1
+
+    def __openRecording__(self, file):
+        debug("Opening bus recording - %s" % file)
+        recording = Adapter(file)
+        recording.file = open(file, "ab")
+        recording.start = monotonic()
+        recording.records = 0
+        recording.file.write(RECORD_SESSION.pack(RECORD_SESSION_MARKER, b"WBT", RECORD_VERSION, time.time()))
+        recording.file.flush()
+        return recording
+
+    def __closeRecording__(self, recording):
+        debug("Closing bus recording - %s (%d records)" % (recording.device, recording.records))
+        recording.file.close()
+
+
+#---------- Replay abstract class ----------
+
+class XXX_REPLAY():
+    def __init__(self, file, timing):
+        self.file = file
+        if timing not in (REPLAY_TIMING_FAST, REPLAY_TIMING_RECORDED):
+            raise ValueError("Unsupported replay timing %s" % timing)
+        self.timing = timing
+        self.replay = REPLAYS.acquire(file, self.__loadReplay__)
+
+    def __str__(self):
+        return "%s (file=%s timing=%s)" % (self.__class__.__name__, self.file, self.timing)
+
+    def open(self):
+        pass
+
+    def closeReplay(self):
+        if self.replay is not None:
+            REPLAYS.release(self.file, self.__unloadReplay__)
+            self.replay = None
+
+    def mismatches(self):
+        return self.replay.mismatches
+
+    def remaining(self):
+        return len(self.replay.records) - self.replay.position
+
+#---------- Helpers ----------
+
+    def __replay__(self, op, slave, addr=0, tx=None):
+        replay = self.replay
+        with replay.lock:
+            if replay.position >= len(replay.records):
+                raise Exception("Error: %s has no more records" % self.__str__())
+            (recordOp, recordSlave, recordAddr, start, duration, recordTx, rx) = replay.records[replay.position]
+            if ((recordOp & ~OP_ERROR) != op) or (recordSlave != slave):
+                raise Exception("Error: %s record %d is method 0x%02X for slave 0x%02X, not method 0x%02X for slave 0x%02X"
+                                % (self.__str__(), replay.position, recordOp & ~OP_ERROR, recordSlave, op, slave))
+            replay.position += 1
+            if (recordAddr != addr) or ((tx is not None) and (recordTx.tobytes() != bytes(toRecordBytes(tx)))):
+                replay.mismatches += 1
+            if self.timing == REPLAY_TIMING_RECORDED:
+                now = monotonic()
+                if replay.start is None:
+                    replay.start = now - start / 1000000.0
+                wait = replay.start + (start + duration) / 1000000.0 - now
+                if wait > 0:
+                    time.sleep(wait)
+        if recordOp & OP_ERROR:
+            raise Exception(rx.tobytes().decode("utf-8"))
+        return rx
+
+    def __replayInt__(self, op, slave, addr=0):
+        return RECORD_INT.unpack(self.__replay__(op, slave, addr).tobytes())[0]
+
+    def __loadReplay__(self, file):
+        debug("Loading bus replay - %s" % file)
+        replay = Adapter(file)
+        with open(file, "rb") as f:
+            data = bytearray(f.read())
+        view = memoryview(data)
+        records = []
+        offset = 0
+        base = 0
+        last = 0
+        while offset < len(data):
+            if data[offset] == RECORD_SESSION_MARKER:
+                # a new session continues the time line after the previous one
+                offset += RECORD_SESSION.size
+                base = last
+                continue
+            (op, slave, addr, start, duration, txSize, rxSize) = RECORD_HEADER.unpack_from(data, offset)
+            offset += RECORD_HEADER.size
+            tx = view[offset:offset+txSize]
+            offset += txSize
+            rx = view[offset:offset+rxSize]
+            offset += rxSize
+            last = base + start + duration
+            records.append((op, slave, addr, base + start, duration, tx, rx))
+        replay.records = records
+        replay.position = 0
+        replay.mismatches = 0
+        replay.start = None
+        return replay
+
+    def __unloadReplay__(self, replay):
+        debug("Unloading bus replay - %s" % replay.device)
+        replay.records = None
+
+
+#---------- I2C recorder and replay ----------
+
+class I2C_RECORDER(XXX_RECORDER, I2C_WRAPPER):
+    def __init__(self, slave=0x00, dev="", file=""):
+        I2C_WRAPPER.__init__(self, slave, dev)
+        XXX_RECORDER.__init__(self, file)
+        Bus.__init__(self, "I2C", "recorder:%s" % dev)
+        I2C_Bus.__init__(self, self.slave)
+        debug("Attached I2C bus device - %s" % self.__str__())
+
+    def close(self):
+        I2C_WRAPPER.close(self)
+        self.closeRecorder()
+
+
+class I2C_REPLAY(XXX_REPLAY, I2C_Bus):
+    def __init__(self, slave=0x00, file="", timing=REPLAY_TIMING_FAST):
+        XXX_REPLAY.__init__(self, file, timing)
+        self.slave = toint(slave)
+        Bus.__init__(self, "I2C", "replay:%s" % file)
+        I2C_Bus.__init__(self, self.slave)
+        debug("Attached I2C bus device - %s" % self.__str__())
+
+    def close(self):
+        I2C_Bus.close(self)
+        self.closeReplay()
+
+    def readBytes(self, size=1):
+        return bytearray(self.__replay__(OP_READ_BYTES, self.slave))
+
+    def writeBytes(self, data):
+        self.__replay__(OP_WRITE_BYTES, self.slave, 0, data)
+
+    def readRegister(self, addr):
+        return self.__replayInt__(OP_READ_REGISTER, self.slave, addr)
+
+    def readRegisters(self, addr, count):
+        return bytearray(self.__replay__(OP_READ_REGISTERS, self.slave, addr))
+
+    def writeRegister(self, addr, byte):
+        self.__replay__(OP_WRITE_REGISTER, self.slave, addr, [byte])
+
+    def writeRegisters(self, addr, buff):
+        self.__replay__(OP_WRITE_REGISTERS, self.slave, addr, buff)
+
+    def transaction(self, messages):
+        messages = [m if m.slave is not None else I2C_Message(m.data, m.size, self.slave) for m in messages]
+        rx = self.__replay__(OP_TRANSACTION, self.slave, 0, encodeMessages(messages))
+        results = []
+        offset = 0
+        for message in messages:
+            if message.isRead():
+                results.append(bytearray(rx[offset:offset+message.size]))
+                offset += message.size
+            else:
+                results.append(None)
+        return results
+
+
+def encodeMessages(messages):
+    data = bytearray()
+    for message in messages:
+        if message.isRead():
+            data += RECORD_MESSAGE.pack(message.slave, 1, message.size)
+        else:
+            data += RECORD_MESSAGE.pack(message.slave, 0, len(message.data))
+            data += bytearray(message.data)
+    return data
+
+
+#---------- SPI recorder and replay ----------
+
+class SPI_RECORDER(XXX_RECORDER, SPI_WRAPPER):
+    def __init__(self, chip=None, mode=None, bits=None, speed=None, dev="", file=""):
+        SPI_WRAPPER.__init__(self, chip, mode, bits, speed, dev)
+        XXX_RECORDER.__init__(self, file)
+        Bus.__init__(self, "SPI", "recorder:%s" % dev)
+        debug("Attached SPI bus device - %s" % self.__str__())
+
+    def close(self):
+        SPI_WRAPPER.close(self)
+        self.closeRecorder()
+
+
+class SPI_REPLAY(XXX_REPLAY, SPI_Bus):
+    def __init__(self, chip=0, mode=0, bits=8, speed=0, file="", timing=REPLAY_TIMING_FAST):
+        XXX_REPLAY.__init__(self, file, timing)
+        Bus.__init__(self, "SPI", "replay:%s" % file)
+        debug("Attached SPI bus device - %s" % self.__str__())
+
+    def close(self):
+        self.closeReplay()
+
+    def readBytes(self, size=1):
+        return bytearray(self.__replay__(OP_READ_BYTES, 0))
+
+    def writeBytes(self, data):
+        self.__replay__(OP_WRITE_BYTES, 0, 0, data)
+
+    def xfer(self, txbuff=None):
+        return bytearray(self.__replay__(OP_XFER, 0, 0, txbuff))
+
+
+#---------- UART recorder and replay ----------
+
+class UART_RECORDER(XXX_RECORDER, UART_WRAPPER):
+    def __init__(self, baudrate=None, dev="", file=""):
+        UART_WRAPPER.__init__(self, baudrate, dev)
+        XXX_RECORDER.__init__(self, file)
+        Bus.__init__(self, "UART", "recorder:%s" % dev, None)
+        debug("Attached UART bus device - %s" % self.__str__())
+
+    def close(self):
+        UART_WRAPPER.close(self)
+        self.closeRecorder()
+
+
+class UART_REPLAY(XXX_REPLAY, UART_Bus):
+    def __init__(self, baudrate=None, file="", timing=REPLAY_TIMING_FAST):
+        XXX_REPLAY.__init__(self, file, timing)
+        Bus.__init__(self, "UART", "replay:%s" % file, None)
+        debug("Attached UART bus device - %s" % self.__str__())
+
+    def close(self):
+        self.closeReplay()
+
+    def read(self, size=1):
+        return self.__replay__(OP_READ, 0).tobytes()
+
+    def write(self, data):
+        self.__replay__(OP_WRITE, 0, 0, data)
+        return len(data)
+
+    def readString(self):
+        data = self.__replay__(OP_READ_STRING, 0).tobytes()
+        if PYTHON_MAJOR >= 3:
+            return data.decode("latin-1")
+        return data
+
+    def writeString(self, string):
+        self.__replay__(OP_WRITE_STRING, 0, 0, string)
+
+    def available(self):
+        return self.__replayInt__(OP_AVAILABLE, 0)
@@ -0,0 +1,194 @@
+#   Copyright 2026 Andreas Riegg - t-h-i-n-x.net
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+#   ----------------------------------------------------------------------------
+#
+#   Changelog
+#
+#   1.0    2026-10-17    Initial release, moved from busrecorder.
+#
+#   1.1    2026-10-17    Transactions via the shared busTransaction().
+#
+#   1.2    2026-10-17    Conflicting bus parameters raise an error.
+#
+#   Implementation and usage remarks
+#
+#   Abstract bus devices that wrap any I2C, SPI or UART bus device, e.g. to record
+#   (see busrecorder) or to monitor (see busmonitor) its traffic. The wrapped bus
+#   device is given via its name as dev: parameter and is opened via the auxiliary
+#   bus pool (see AuxiliaryBus), so all wrappers and other layered buses with the
+#   same dev: parameter share one instance of it. The bus parameters of the
+#   wrapper (slave for I2C, chip, mode, bits and speed for SPI, baudrate for UART)
+#   are passed to that instance when it is created by the first user, parameters
+#   that are not given are taken from the declaration of the wrapped bus device.
+#   A wrapper whose parameters differ from those of the existing instance raises
+#   an exception. The wrapped bus device may itself be a layered bus, e.g. an
+#   I2C_MUX channel or a USB-ISS bus:
+#
+#   [BUSES]
+#   serial = UART_DEV dev:ttyACM0 baudrate:115200
+#   iss = I2C_RE_USB_ISS dev:serial
+#   rec1 = I2C_RECORDER dev:iss file:/var/log/webiopi/iss.rec
+#
+#   Each call of a bus method is passed to the wrapped bus device while holding
+#   the lock of the pooled bus. I2C wrappers set the slave address of the shared
+#   instance to their own slave address for the duration of the call.
+#
+#   Subclasses implement __wrap__(op, addr, tx, size, function, *args), which has
+#   to call function(*args) and return its result. op is the OP_XXX code of the
+#   called method, addr the register address, tx the written data (the list of
+#   messages for I2C transactions) and size the number of transferred data bytes
+#   or None if the size is only known from the result.
+#
+
+from webiopi.devices.bus import I2C_Bus, SPI_Bus, UART_Bus
+from webiopi.devices.buses.auxiliary import AuxiliaryBus
+from webiopi.devices.buses.i2cmessage import I2C_Message, busTransaction, transactionSize
+from webiopi.utils.types import toint
+
+OP_READ_BYTES            = 0x01
+OP_WRITE_BYTES           = 0x02
+OP_READ_REGISTER         = 0x03
+OP_READ_REGISTERS        = 0x04
+OP_WRITE_REGISTER        = 0x05
+OP_WRITE_REGISTERS       = 0x06
+OP_TRANSACTION           = 0x07
+OP_XFER                  = 0x08
+OP_READ                  = 0x09
+OP_WRITE                 = 0x0A
+OP_READ_STRING           = 0x0B
+OP_WRITE_STRING          = 0x0C
+OP_AVAILABLE             = 0x0D
+
+
+#---------- Wrapper abstract class ----------
+
+class XXX_WRAPPER(AuxiliaryBus):
+    def __init__(self, dev, slave=None, extraKwargs={}):
+        self.upstreamName = dev
+        self.wrappedSlave = slave
+        kwargs = {}
+        for (name, value) in extraKwargs.items():
+            if value is not None:
+                kwargs[name] = value
+        self.upstream = self.openAuxiliaryBus(dev, **kwargs)
+        self.upstreamLock = self.getAuxiliaryBusLock(dev)
+
+#---------- BUS open() and close() reimplementation to handle the wrapped bus ----------
+
+    def open(self):
+        pass
+
+    def closeWrapper(self):
+        if self.upstream is not None:
+            self.closeAuxiliaryBus(self.upstreamName)
+            self.upstream = None
+
+#---------- Helpers ----------
+
+    def __wrap__(self, op, addr, tx, size, function, *args):
+        return function(*args)
+
+    def __upstream__(self, function, *args):
+        with self.upstreamLock:
+            return function(*args)
+
+
+#---------- I2C wrapper ----------
+
+class I2C_WRAPPER(XXX_WRAPPER, I2C_Bus):
+    def __init__(self, slave, dev):
+        self.slave = toint(slave)
+        XXX_WRAPPER.__init__(self, dev, self.slave, {"slave": self.slave})
+
+    def close(self):
+        I2C_Bus.close(self)
+        self.closeWrapper()
+
+    def readBytes(self, size=1):
+        return self.__wrap__(OP_READ_BYTES, 0, None, size, self.__upstream__, self.upstream.readBytes, size)
+
+    def writeBytes(self, data):
+        return self.__wrap__(OP_WRITE_BYTES, 0, data, len(data), self.__upstream__, self.upstream.writeBytes, data)
+
+    def readRegister(self, addr):
+        return self.__wrap__(OP_READ_REGISTER, addr, None, 2, self.__upstream__, self.upstream.readRegister, addr)
+
+    def readRegisters(self, addr, count):
+        return self.__wrap__(OP_READ_REGISTERS, addr, None, count + 1, self.__upstream__, self.upstream.readRegisters, addr, count)
+
+    def writeRegister(self, addr, byte):
+        return self.__wrap__(OP_WRITE_REGISTER, addr, [byte], 2, self.__upstream__, self.upstream.writeRegister, addr, byte)
+
+    def writeRegisters(self, addr, buff):
+        return self.__wrap__(OP_WRITE_REGISTERS, addr, buff, len(buff) + 1, self.__upstream__, self.upstream.writeRegisters, addr, buff)
+
+    def transaction(self, messages):
+        messages = [m if m.slave is not None else I2C_Message(m.data, m.size, self.slave) for m in messages]
+        return self.__wrap__(OP_TRANSACTION, 0, messages, transactionSize(messages), self.__upstream__, busTransaction, self.upstream, messages)
+
+#---------- Helpers ----------
+
+    def __upstream__(self, function, *args):
+        with self.upstreamLock:
+            upstreamSlave = self.upstream.slave
+            self.upstream.slave = self.slave
+            try:
+                return function(*args)
+            finally:
+                self.upstream.slave = upstreamSlave
+
+
+#---------- SPI wrapper ----------
+
+class SPI_WRAPPER(XXX_WRAPPER, SPI_Bus):
+    def __init__(self, chip, mode, bits, speed, dev):
+        XXX_WRAPPER.__init__(self, dev, None, {"chip": chip, "mode": mode, "bits": bits, "speed": speed})
+
+    def close(self):
+        self.closeWrapper()
+
+    def readBytes(self, size=1):
+        return self.__wrap__(OP_READ_BYTES, 0, None, size, self.__upstream__, self.upstream.readBytes, size)
+
+    def writeBytes(self, data):
+        return self.__wrap__(OP_WRITE_BYTES, 0, data, len(data), self.__upstream__, self.upstream.writeBytes, data)
+
+    def xfer(self, txbuff=None):
+        return self.__wrap__(OP_XFER, 0, txbuff, len(txbuff), self.__upstream__, self.upstream.xfer, txbuff)
+
+
+#---------- UART wrapper ----------
+
+class UART_WRAPPER(XXX_WRAPPER, UART_Bus):
+    def __init__(self, baudrate, dev):
+        XXX_WRAPPER.__init__(self, dev, None, {"baudrate": baudrate})
+
+    def close(self):
+        self.closeWrapper()
+
+    def read(self, size=1):
+        return self.__wrap__(OP_READ, 0, None, None, self.__upstream__, self.upstream.read, size)
+
+    def write(self, data):
+        return self.__wrap__(OP_WRITE, 0, data, len(data), self.__upstream__, self.upstream.write, data)
+
+    def readString(self):
+        return self.__wrap__(OP_READ_STRING, 0, None, None, self.__upstream__, self.upstream.readString)
+
+    def writeString(self, string):
+        return self.__wrap__(OP_WRITE_STRING, 0, string, len(string), self.__upstream__, self.upstream.writeString, string)
+
+    def available(self):
+        return self.__wrap__(OP_AVAILABLE, 0, None, None, self.__upstream__, self.upstream.available)
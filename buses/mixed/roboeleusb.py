@@ -18,6 +18,19 @@
 #
 #   1.0    2017-02-27    Initial release.
 #
+#   1.1    2026-10-17    Response reading waits for the serial bus instead of
+#                        polling, raises an error on timeout.
+#
+#   1.2    2026-10-17    Locking of the serial bus, pipelined batch transfers.
+#
+#   1.3    2026-10-17    One serial bus and lock per auxiliary bus name.
+#
+#   1.4    2026-10-17    Serial buses shared via the auxiliary bus pool.
+#
+#   1.5    2026-10-17    Input of the serial bus is drained after a response timeout.
+#
+#   1.6    2026-10-17    Input of the serial bus is drained after any failed command.
+#
 #   Implementation and usage remarks
 #
 #   Implements I2C and SPI device connectivity using the Robot Electronics USB-ISS
@@ -61,24 +74,64 @@
 #
 #   The maximum SPI frequency of USB-ISS is 3 Mhz, the maximum I2C frequency is 1 MHz.
 #
+#   Responses are awaited via select() on the file descriptor of the auxiliary serial
+#   bus (e.g. UART_DEV). For serial buses without file descriptor the bus is polled
+#   in intervals of RE_USB_POLL_INTERVAL seconds. If the complete response has not
+#   been received within timeout seconds (default 0.5) an exception is raised. The
+#   timeout can be set via the timeout: parameter, e.g.
+#
+#   issi2c = I2C_RE_USB_ISS dev:auxserial timeout:1.0
+#
+#   Before an error of a command (e.g. a timeout, a failed write or read of the serial
+#   bus) is raised, the input of the serial bus is drained until
+#   no more bytes arrive within timeout seconds (max RE_USB_DRAIN_TIMEOUTS timeouts
+#   in total), so late bytes of the failed response cannot be taken as response to
+#   the next command.
+#
+#   Several USB-XXX adapters can be used in parallel, each one via its own auxiliary
+#   serial bus. All XXX_RE_USB_XXX bus devices with the same dev: parameter share one
+#   pooled instance of that serial bus, which is opened with the first and closed
+#   with the last of these bus devices (see AuxiliaryBus).
+#
+#   Each command and its response are exchanged while holding the lock of the serial
+#   bus, so concurrent requests (e.g. via the REST API) cannot interleave their
+#   commands. Adapters on different serial buses do not block each other.
+#
+#   Batches of commands can be pipelined: all commands are sent with one serial write
+#   and the concatenated responses are read in one pass and split per command. This
+#   saves the serial latency of every command but the first. Batches are split into
+#   writes of max RE_USB_PIPELINE_BYTES bytes to not overrun the adapter.
+#
+#   results = issi2c.batchReadRegisters([(0x20, 0x09, 1), (0x21, 0x09, 1), (0x48, 0x00, 2)])
+#   issi2c.batchWriteRegisters([(0x20, 0x0A, [0xFF]), (0x21, 0x0A, [0x00])])
+#   results = issspi.batchXfer([[0x01, 0x80, 0x00], [0x01, 0x90, 0x00]])
+#
 #   Not all functionalities of USB-ISS and USB-I2C are supported. Only those needed
 #   to provide all SPI and I2C methods needed for WebIOPi devices are implemented.
 #
 
 import webiopi
-from webiopi.devices.bus import Bus, SPI_Bus, I2C_Bus, SLAVES
+from webiopi.devices.bus import Bus, SPI_Bus, I2C_Bus
 from webiopi.devices.buses.auxiliary import AuxiliaryBus
 from webiopi.utils.types import toint
 from webiopi.utils.logger import debug, info
-from datetime import datetime
+import errno
+import select
+import time
 
-SERIALBUS = None
-#Todo: Locking
+monotonic = getattr(time, "monotonic", time.time)
 
-MAX_I2C_SLAVES_COUNT   = 128
 MAX_I2C_TRANSFER_BYTES =  60
 MAX_SPI_TRANSFER_BYTES =  62
 
+RE_USB_DEFAULT_TIMEOUT = 0.5
+#Polling interval for auxiliary buses without file descriptor
+RE_USB_POLL_INTERVAL   = 0.002
+#Max duration of draining the serial bus input after an error, in timeouts
+RE_USB_DRAIN_TIMEOUTS  = 4
+#Max number of command bytes sent at once when pipelining commands
+RE_USB_PIPELINE_BYTES  = 64
+
 #---------- USB-ISS device constants ----------
 #ISS commands
 ISS_COMMAND_ISS_CMD  = 0x5A
@@ -118,40 +171,108 @@ I2C_SUBCOMMAND_I2C_REVISION = 0x01
 #---------- USB-XXX abstract class ----------
 
 class XXX_RE_USB_XXX(AuxiliaryBus):
-    def __init__(self, dev=""):
+    def __init__(self, dev="", timeout=RE_USB_DEFAULT_TIMEOUT):
         self.serialBusName = dev
-
-        global SERIALBUS
-        if SERIALBUS is None:
-            SERIALBUS = self.openAuxiliaryBus(dev)
+        self.timeout = float(timeout)
+        self.serialBus = self.openAuxiliaryBus(dev)
+        self.serialLock = self.getAuxiliaryBusLock(dev)
 
     def __str__(self):
         return "%s (ser=%s)" % (self.__class__.__name__, self.serialBusName)
 
+    def __releaseSerialBus__(self):
+        if self.serialBus is not None:
+            self.closeAuxiliaryBus(self.serialBusName)
+            self.serialBus = None
+
 #---------- Helpers ----------
 
-    def __readResponse__(self, size):
-        t1 = datetime.now()
-        response = []
-        missing = size
-        while missing > 0:
-            response += SERIALBUS.read(missing)
-            missing = size - len(response)
-            debug("%s readResponse missing=%d" % (self.__str__(), missing))
-            # check for timeout
-            t2 = datetime.now()
-            elapsed = t2 - t1
-            if elapsed.total_seconds() > 0.5:
-                debug("%s timeout" % self.__str__())
-                return bytearray(size)
-        return bytearray(response)
+    def __command__(self, buff, size):
+        return self.__pipeline__([(buff, size)])[0]
+
+    def __pipeline__(self, commands):
+        responses = []
+        with self.serialLock:
+            try:
+                start = 0
+                while start < len(commands):
+                    end = start + 1
+                    length = len(commands[start][0])
+                    while (end < len(commands)) and (length + len(commands[end][0]) <= RE_USB_PIPELINE_BYTES):
+                        length += len(commands[end][0])
+                        end += 1
+                    request = bytearray()
+                    size = 0
+                    for (buff, responseSize) in commands[start:end]:
+                        request += buff
+                        size += responseSize
+                    self.serialBus.write(request)
+                    response = self.__readResponse__(size, self.timeout * (end - start))
+                    offset = 0
+                    for (buff, responseSize) in commands[start:end]:
+                        responses.append(response[offset:offset+responseSize])
+                        offset += responseSize
+                    start = end
+            except Exception:
+                self.__drainInput__()
+                raise
+        return responses
+
+    def __readResponse__(self, size, timeout=None):
+        if timeout is None:
+            timeout = self.timeout
+        deadline = monotonic() + timeout
+        response = bytearray(size)
+        received = 0
+        while received < size:
+            data = self.__readAvailable__(size - received)
+            if len(data) > 0:
+                response[received:received+len(data)] = data
+                received += len(data)
+                continue
+            remaining = deadline - monotonic()
+            if remaining <= 0:
+                raise Exception("Error: %s timeout, received %d of %d response bytes." % (self.__str__(), received, size))
+            self.__waitReadable__(remaining)
+        return response
+
+    def __drainInput__(self):
+        with self.serialLock:
+            deadline = monotonic() + self.timeout * RE_USB_DRAIN_TIMEOUTS
+            quiet = monotonic() + self.timeout
+            try:
+                while monotonic() < deadline:
+                    if len(self.__readAvailable__(RE_USB_PIPELINE_BYTES)) > 0:
+                        quiet = monotonic() + self.timeout
+                        continue
+                    remaining = quiet - monotonic()
+                    if remaining <= 0:
+                        break
+                    self.__waitReadable__(remaining)
+            except (IOError, OSError):
+                pass
+
+    def __readAvailable__(self, size):
+        try:
+            return self.serialBus.read(size)
+        except (IOError, OSError) as e:
+            if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                return b""
+            raise
+
+    def __waitReadable__(self, timeout):
+        fd = getattr(self.serialBus, "fd", None)
+        if isinstance(fd, int) and (fd > 0):
+            select.select([fd], [], [], timeout)
+        else:
+            time.sleep(min(timeout, RE_USB_POLL_INTERVAL))
 
 
 #---------- USB-XXX I2C abstract class ----------
 
 class I2C_RE_USB_XXX(XXX_RE_USB_XXX, I2C_Bus):
 
-#---------- BUS open() and close() reimplementation to handle serial bus singleton ----------
+#---------- BUS open() and close() reimplementation to handle the shared serial bus ----------
 
     def open(self):
         debug("Opening I2C bus device - %s" % self.__str__())
@@ -159,12 +280,7 @@ class I2C_RE_USB_XXX(XXX_RE_USB_XXX, I2C_Bus):
     def close(self):
         debug("Closing I2C bus device - %s" % self.__str__())
         I2C_Bus.close(self)
-        if SLAVES[self.device].count(None) == MAX_I2C_SLAVES_COUNT: #No more registered slaves
-            debug("Closing auxiliary serial bus device - %s (ser=%s)"  % (self.__class__.__name__, self.serialBusName))
-            global SERIALBUS
-            if SERIALBUS is not None:
-                SERIALBUS.close()
-                SERIALBUS = None
+        self.__releaseSerialBus__()
 
 #---------- Bus and I2C abstraction communication methods redirected to USB-ISS/USB-I2C command sequences ----------
 
@@ -176,8 +292,7 @@ class I2C_RE_USB_XXX(XXX_RE_USB_XXX, I2C_Bus):
         buff[0] = ISS_COMMAND_I2C_AD0
         buff[1] = slaveAddress
         buff[2] = size
-        SERIALBUS.write(buff)
-        return self.__readResponse__(size)
+        return self.__command__(buff, size)
 
     def writeBytes(self, data):
         size = len(data)
@@ -189,8 +304,7 @@ class I2C_RE_USB_XXX(XXX_RE_USB_XXX, I2C_Bus):
         buff[1]  = slaveAddress
         buff[2]  = size
         buff[3:] = data
-        SERIALBUS.write(buff)
-        result = self.__readResponse__(1)
+        result = self.__command__(buff, 1)
         if result[0] == 0:
              raise Exception("Write error %s " % self.device)
 
@@ -198,45 +312,66 @@ class I2C_RE_USB_XXX(XXX_RE_USB_XXX, I2C_Bus):
         return self.readRegisters(addr, 1)[0]
 
     def readRegisters(self, addr, count):
+        return self.__command__(self.__readRegistersCommand__(self.slave, addr, count), count)
+
+    def writeRegister(self, addr, byte):
+        self.writeRegisters(addr, bytearray([byte]))
+
+    def writeRegisters(self, addr, data):
+        result = self.__command__(self.__writeRegistersCommand__(self.slave, addr, data), 1)
+        if result[0] == 0:
+            raise Exception("Write error %s " % self.device)
+
+#---------- Pipelined batch transfers ----------
+
+    def batchReadRegisters(self, requests):
+        commands = []
+        for (slave, addr, count) in requests:
+            commands.append((self.__readRegistersCommand__(slave, addr, count), count))
+        return self.__pipeline__(commands)
+
+    def batchWriteRegisters(self, requests):
+        commands = []
+        for (slave, addr, data) in requests:
+            commands.append((self.__writeRegistersCommand__(slave, addr, data), 1))
+        results = self.__pipeline__(commands)
+        for i in range(len(results)):
+            if results[i][0] == 0:
+                raise Exception("Write error %s (slave=0x%02X)" % (self.device, requests[i][0]))
+
+#---------- Helpers ----------
+
+    def __readRegistersCommand__(self, slave, addr, count):
         if count > MAX_I2C_TRANSFER_BYTES:
             raise Exception("Error: XXX-I2C driver can only read max %d bytes." % MAX_I2C_TRANSFER_BYTES)
-        slaveAddress = (self.slave << 1) + 1
         buff = bytearray(4)
         buff[0] = ISS_COMMAND_I2C_AD1
-        buff[1] = slaveAddress
+        buff[1] = (slave << 1) + 1
         buff[2] = addr
         buff[3] = count
-        SERIALBUS.write(buff)
-        return self.__readResponse__(count)
-
-    def writeRegister(self, addr, byte):
-        self.writeRegisters(addr, bytearray([byte]))
+        return buff
 
-    def writeRegisters(self, addr, data):
+    def __writeRegistersCommand__(self, slave, addr, data):
         size = len(data)
         if size > MAX_I2C_TRANSFER_BYTES:
             raise Exception("Error: XXX-I2C driver can only write max %d bytes." % MAX_I2C_TRANSFER_BYTES)
-        slaveAddress = self.slave << 1
         buff = bytearray(4 + size)
         buff[0]  = ISS_COMMAND_I2C_AD1
-        buff[1]  = slaveAddress
+        buff[1]  = slave << 1
         buff[2]  = addr
         buff[3]  = size
         buff[4:] = data
-        SERIALBUS.write(buff)
-        result = self.__readResponse__(1)
-        if result[0] == 0:
-            raise Exception("Write error %s " % self.device)
+        return buff
 
 
 #---------- USB-ISS I2C concrete class ----------
 
 class I2C_RE_USB_ISS(I2C_RE_USB_XXX):
-    def __init__(self, slave=0x00, speed=100000, dev=""):
+    def __init__(self, slave=0x00, speed=100000, dev="", timeout=RE_USB_DEFAULT_TIMEOUT):
         self.slave = slave
         self.speed = toint(speed)
 
-        XXX_RE_USB_XXX.__init__(self, dev)
+        XXX_RE_USB_XXX.__init__(self, dev, timeout)
         Bus.__init__(self, "I2C", "usb-iss:%s" % dev)
         I2C_Bus.__init__(self, slave)
 
@@ -254,8 +389,7 @@ class I2C_RE_USB_ISS(I2C_RE_USB_XXX):
         buff = bytearray(2)
         buff[0] = ISS_COMMAND_ISS_CMD
         buff[1] = ISS_SUBCOMMAND_ISS_VERSION
-        SERIALBUS.write(buff)
-        return self.__readResponse__(3)
+        return self.__command__(buff, 3)
 
     def __setI2CMode__(self, preferredSpeed):
         if self.speed > 1000000:
@@ -278,17 +412,16 @@ class I2C_RE_USB_ISS(I2C_RE_USB_XXX):
         buff[1] = ISS_SUBCOMMAND_ISS_MODE
         buff[2] = speedmode
         buff[3] = 0x00
-        SERIALBUS.write(buff)
-        return self.__readResponse__(2)
+        return self.__command__(buff, 2)
 
 
 #---------- USB-I2C I2C concrete class ----------
 
 class I2C_RE_USB_I2C(I2C_RE_USB_XXX):
-    def __init__(self, slave=0x00, dev=""):
+    def __init__(self, slave=0x00, dev="", timeout=RE_USB_DEFAULT_TIMEOUT):
         self.slave = slave
 
-        XXX_RE_USB_XXX.__init__(self, dev)
+        XXX_RE_USB_XXX.__init__(self, dev, timeout)
         Bus.__init__(self, "I2C", "usb-i2c:%s" % dev)
         I2C_Bus.__init__(self, slave)
 
@@ -303,14 +436,13 @@ class I2C_RE_USB_I2C(I2C_RE_USB_XXX):
         buff = bytearray(4)
         buff[0] = I2C_COMMAND_I2C_CMD
         buff[1] = I2C_SUBCOMMAND_I2C_REVISION
-        SERIALBUS.write(buff)
-        return self.__readResponse__(1)
+        return self.__command__(buff, 1)
 
 
 #---------- USB-ISS SPI concrete class ----------
 
 class SPI_RE_USB_ISS(XXX_RE_USB_XXX, SPI_Bus):
-    def __init__(self, chip=0, mode=0, bits=8, speed=3000000, dev=""):
+    def __init__(self, chip=0, mode=0, bits=8, speed=3000000, dev="", timeout=RE_USB_DEFAULT_TIMEOUT):
         #self.chip = toint(chip) unused as USB-ISS has only one CS pin.
         self.mode = toint(mode)
         #self.bits = toint(bits) unused
@@ -319,7 +451,7 @@ class SPI_RE_USB_ISS(XXX_RE_USB_XXX, SPI_Bus):
             debug("Maximum SPI speed for USB-ISS is 3,000,000.0 Hz (%s Hz is given)" % '{:,.1f}'.format(self.speed))
             self.speed = 3000000
 
-        XXX_RE_USB_XXX.__init__(self, dev)
+        XXX_RE_USB_XXX.__init__(self, dev, timeout)
         Bus.__init__(self, "SPI", "usb-iss:%s" % dev)
 
         res = self.__setSPIParameters__(self.mode, self.speed)
@@ -331,7 +463,7 @@ class SPI_RE_USB_ISS(XXX_RE_USB_XXX, SPI_Bus):
         res = self.__getVersion__()
         debug("USB-ISS bus device version - 0x%02X 0x%02X 0x%02X" % (res[0], res[1], res[2]))
 
-#---------- BUS open() and close() reimplementation to handle serial bus singleton ----------
+#---------- BUS open() and close() reimplementation to handle the shared serial bus ----------
 
     def open(self):
         debug("Opening SPI bus device - %s" % self.__str__())
@@ -339,39 +471,47 @@ class SPI_RE_USB_ISS(XXX_RE_USB_XXX, SPI_Bus):
     def close(self):
         debug("Closing SPI bus device - %s" % self.__str__())
         SPI_Bus.close(self)
-        global SERIALBUS
-        if SERIALBUS is not None:
-            SERIALBUS.close()
-            SERIALBUS = None
+        self.__releaseSerialBus__()
 
 #---------- Bus and SPI abstraction communication methods redirected to USB-ISS command sequences ----------
 
     def xfer(self, data=[]):
         debug("%s xfer send %s" % (self.__str__(), data))
-        size = len(data)
-        if size > MAX_SPI_TRANSFER_BYTES:
-            raise Exception("Error: ISS-SPI driver can only transfer max %d bytes." % MAX_SPI_TRANSFER_BYTES)
-        buff = bytearray(1 + size)
-        buff[0]  = ISS_COMMAND_SPI
-        buff[1:] = data
-        SERIALBUS.write(buff)
-        result = self.__readResponse__(len(buff))
+        result = self.__command__(self.__xferCommand__(data), len(data) + 1)
         if result[0] == 0:
              raise Exception("Xfer error %s " % self.device)
         return result[1:]
 
+    def batchXfer(self, transfers):
+        commands = []
+        for data in transfers:
+            commands.append((self.__xferCommand__(data), len(data) + 1))
+        results = self.__pipeline__(commands)
+        for result in results:
+            if result[0] == 0:
+                raise Exception("Xfer error %s " % self.device)
+        return [result[1:] for result in results]
+
     def writeBytes(self, data):
         debug("%s writeBytes" % self.__str__())
         self.xfer(data)
 
 #---------- Helpers ----------
 
+    def __xferCommand__(self, data):
+        size = len(data)
+        if size > MAX_SPI_TRANSFER_BYTES:
+            raise Exception("Error: ISS-SPI driver can only transfer max %d bytes." % MAX_SPI_TRANSFER_BYTES)
+        buff = bytearray(1 + size)
+        buff[0]  = ISS_COMMAND_SPI
+        buff[1:] = data
+        return buff
+
     def __getVersion__(self):
         buff = bytearray(2)
         buff[0] = ISS_COMMAND_ISS_CMD
         buff[1] = ISS_SUBCOMMAND_ISS_VERSION
-        SERIALBUS.write(buff)
-        return self.__readResponse__(3)
+        return self.__command__(buff, 3)
 
     def __setSPIParameters__(self, mode, speed):
 
@@ -385,6 +525,5 @@ class SPI_RE_USB_ISS(XXX_RE_USB_XXX, SPI_Bus):
         buff[2] = ISS_VALUE_ISS_MODE_SPI + mode
         buff[3] = clkdiv
 
-        SERIALBUS.write(buff)
-        return self.__readResponse__(2)
+        return self.__command__(buff, 2)
 
@@ -0,0 +1,85 @@
+#   Copyright 2026 Andreas Riegg - t-h-i-n-x.net
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+#   ----------------------------------------------------------------------------
+#
+#   Changelog
+#
+#   1.0    2026-10-17    Initial release.
+#
+#   Implementation and usage remarks
+#
+#   Timing model for the bus mockups. Each transfer takes the time needed to
+#   clock its bits over the simulated bus plus a fixed latency per transaction
+#   and an optional stretch time per byte (e.g. I2C clock stretching):
+#
+#   duration = transactions * (latency + overheadBits / clock)
+#            + size * (bitsPerByte / clock + stretch)
+#
+#   The durations are accumulated on a simulated bus time line. Callers only
+#   sleep when they are ahead of that time line by at least MOCK_TIMING_MIN_SLEEP
+#   seconds, so the average throughput matches the simulated bus even for
+#   transfers that are much shorter than the resolution of time.sleep().
+#
+#   busTime holds the total simulated bus time in seconds, independent of the
+#   accuracy of sleeping, e.g. for deterministic benchmark results.
+#
+
+from threading import Lock
+import time
+
+monotonic = getattr(time, "monotonic", time.time)
+
+MOCK_TIMING_MIN_SLEEP = 0.001
+
+
+class MockTiming():
+    def __init__(self, clock=0, bitsPerByte=8, overheadBits=0, latency=0.0, stretch=0.0):
+        self.clock = clock
+        self.bitsPerByte = bitsPerByte
+        self.overheadBits = overheadBits
+        self.latency = latency
+        self.stretch = stretch
+        self.lock = Lock()
+        self.due = 0.0
+        self.busTime = 0.0
+        self.transactions = 0
+        self.bytes = 0
+
+    def __str__(self):
+        return "MockTiming(clock=%d latency=%s stretch=%s)" % (self.clock, self.latency, self.stretch)
+
+    def isEnabled(self):
+        return (self.clock > 0) or (self.latency > 0) or (self.stretch > 0)
+
+    def duration(self, size, transactions=1):
+        byteTime = self.stretch
+        transactionTime = self.latency
+        if self.clock > 0:
+            byteTime += float(self.bitsPerByte) / self.clock
+            transactionTime += float(self.overheadBits) / self.clock
+        return transactions * transactionTime + size * byteTime
+
+    def transfer(self, size, transactions=1):
+        duration = self.duration(size, transactions)
+        with self.lock:
+            now = monotonic()
+            self.due = max(now, self.due) + duration
+            self.busTime += duration
+            self.transactions += transactions
+            self.bytes += size
+            wait = self.due - now
+        if wait >= MOCK_TIMING_MIN_SLEEP:
+            time.sleep(wait)
+        return duration
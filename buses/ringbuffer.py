@@ -0,0 +1,195 @@
+#   Copyright 2026 Andreas Riegg - t-h-i-n-x.net
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+#   ----------------------------------------------------------------------------
+#
+#   Changelog
+#
+#   1.0    2026-10-17    Initial release.
+#
+#   1.1    2026-10-17    readFrom() can tell end of file from no data.
+#
+#   Implementation and usage remarks
+#
+#   Fixed-size byte ring buffer for bus drivers that have to buffer incoming
+#   data, e.g. serial interfaces. The storage is one bytearray allocated at
+#   creation time, so no memory gets allocated while data flows through.
+#
+#   - write() appends data. If there is not enough free space, either only
+#     the fitting part is stored or, with overwrite=True, the oldest bytes
+#     are dropped. Dropped bytes are counted in the attribute dropped.
+#   - readFrom(fd) reads directly from a file descriptor into the free space
+#     of the ring buffer (via os.readv where available). It returns the number
+#     of bytes read, 0 at end of file and the value of again (default 0) if a
+#     non-blocking file descriptor has no data.
+#   - read(), readinto(), peek(), peekinto(), find() and skip() consume or
+#     inspect the buffered data.
+#   - views() returns the buffered data as up to two memoryviews (two if the
+#     data wraps around the end of the storage) without copying.
+#
+#   The ring buffer is not thread-safe, callers have to do their own locking.
+#
+
+import os
+import errno
+
+
+class RingBuffer():
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.buffer = bytearray(capacity)
+        self.view = memoryview(self.buffer)
+        self.start = 0
+        self.count = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return self.count
+
+    def __str__(self):
+        return "RingBuffer(capacity=%d count=%d)" % (self.capacity, self.count)
+
+    def free(self):
+        return self.capacity - self.count
+
+    def isFull(self):
+        return self.count == self.capacity
+
+    def clear(self):
+        self.start = 0
+        self.count = 0
+
+#---------- Writing ----------
+
+    def write(self, data, overwrite=False):
+        size = len(data)
+        if size > self.free():
+            if overwrite:
+                if size >= self.capacity:
+                    data = data[size - self.capacity:]
+                    self.dropped += self.count + size - self.capacity
+                    self.clear()
+                    size = self.capacity
+                else:
+                    self.__drop__(size - self.free())
+            else:
+                size = self.free()
+                data = data[:size]
+        end = (self.start + self.count) % self.capacity
+        first = min(size, self.capacity - end)
+        self.view[end:end+first] = data[:first]
+        if first < size:
+            self.view[:size-first] = data[first:size]
+        self.count += size
+        return size
+
+    def readFrom(self, fd, again=0):
+        free = self.free()
+        if free == 0:
+            return 0
+        end = (self.start + self.count) % self.capacity
+        first = min(free, self.capacity - end)
+        try:
+            if hasattr(os, "readv"):
+                if first < free:
+                    size = os.readv(fd, [self.view[end:end+first], self.view[:free-first]])
+                else:
+                    size = os.readv(fd, [self.view[end:end+first]])
+            else:
+                data = os.read(fd, free)
+                return self.write(data)
+        except OSError as e:
+            if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                return again
+            raise
+        self.count += size
+        return size
+
+#---------- Reading ----------
+
+    def read(self, size=-1):
+        if (size < 0) or (size > self.count):
+            size = self.count
+        data = bytearray(size)
+        self.readinto(data)
+        return data
+
+    def readinto(self, buff):
+        target = memoryview(buff)
+        size = min(len(target), self.count)
+        self.__copyTo__(target, size)
+        self.skip(size)
+        return size
+
+    def peek(self, size=-1):
+        if (size < 0) or (size > self.count):
+            size = self.count
+        data = bytearray(size)
+        self.__copyTo__(memoryview(data), size)
+        return data
+
+    def peekinto(self, buff):
+        target = memoryview(buff)
+        size = min(len(target), self.count)
+        self.__copyTo__(target, size)
+        return size
+
+    def skip(self, size):
+        size = min(size, self.count)
+        self.start = (self.start + size) % self.capacity
+        self.count -= size
+        if self.count == 0:
+            self.start = 0
+        return size
+
+    def views(self):
+        end = self.start + self.count
+        if end <= self.capacity:
+            return (self.view[self.start:end],)
+        return (self.view[self.start:], self.view[:end - self.capacity])
+
+    def byteAt(self, index):
+        return self.buffer[(self.start + index) % self.capacity]
+
+    def find(self, sep, start=0):
+        sep = bytes(sep)
+        end = self.start + self.count
+        if end <= self.capacity:
+            index = self.buffer.find(sep, self.start + start, end)
+            return -1 if index < 0 else index - self.start
+        # data wraps around, search first part, the seam and the second part
+        firstSize = self.capacity - self.start
+        if start < firstSize:
+            index = self.buffer.find(sep, self.start + start, self.capacity)
+            if index >= 0:
+                return index - self.start
+            seamStart = max(start, firstSize - len(sep) + 1)
+            seam = self.peek(min(self.count, firstSize + len(sep) - 1))[seamStart:]
+            index = seam.find(sep)
+            if index >= 0:
+                return seamStart + index
+            start = firstSize
+        index = self.buffer.find(sep, start - firstSize, end - self.capacity)
+        return -1 if index < 0 else index + firstSize
+
+#---------- Helpers ----------
+
+    def __copyTo__(self, target, size):
+        first = min(size, self.capacity - self.start)
+        target[:first] = self.view[self.start:self.start+first]
+        if first < size:
+            target[first:size] = self.view[:size-first]
+
+    def __drop__(self, size):
+        self.dropped += self.skip(size)
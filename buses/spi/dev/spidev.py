@@ -18,13 +18,63 @@
 #   Changelog
 #
 #   1.1    2016-06-28    Patched version for bus selection.
+#   1.2    2026-10-17    Reusable transfer buffers and xferInto().
+#   1.3    2026-10-17    Added xferMulti() for multi-segment SPI_IOC_MESSAGE(n).
+#   1.4    2026-10-17    Chunked streaming transfers beyond the spidev bufsiz.
+#   1.5    2026-10-17    Lock the reusable transfer buffers.
 #
+#   Implementation and usage remarks
+#
+#   The transmit and receive buffers handed over to the kernel as well as the
+#   spi_ioc_transfer struct are allocated once per bus instance and reused
+#   for every transfer. The buffers grow on demand when a longer transfer
+#   is requested. As the buffers are shared by all transfer methods, each
+#   transfer holds the instance lock while it uses them, so concurrent
+#   transfers on the same bus instance (e.g. from REST requests) are
+#   serialized.
+#
+#   xferInto(txbuff, rxbuff) accepts any buffer protocol object (bytes,
+#   bytearray, array, memoryview ...) as txbuff and copies the received bytes
+#   directly into the caller provided writable rxbuff, so polling loops can
+#   reuse their own buffers without any allocations per transfer. xfer() is
+#   a thin wrapper around xferInto() that returns a new bytearray.
+#
+#   xferMulti(segments) packs a list of SPI_Segment objects into one single
+#   SPI_IOC_MESSAGE(n) ioctl. Each segment either transmits data or, when
+#   only a size is given, clocks out zeros to read size bytes. Per segment
+#   the speed, bits per word, the delay after the segment (in microseconds)
+#   and cs_change can be set. Speed and bits of 0 use the bus settings.
+#   With csChange=True CS is deselected after the segment before the next
+#   one starts. The result is a list with the received bytes per segment.
+#   Example for a command and response sequence with CS toggled in between:
+#
+#   results = bus.xferMulti([SPI_Segment([cmd], csChange=True),
+#                            SPI_Segment(size=2)])
+#
+#   The spidev kernel driver limits the total size of one SPI message to its
+#   bufsiz module parameter (4096 bytes by default). The effective value is
+#   read once from sysfs. Longer xfer() and xferInto() calls are split into
+#   chunks of maximal size, one ioctl per chunk, and CS is kept selected
+#   between the chunks. This is done via cs_change on the last transfer of
+#   each message, so it depends on the SPI controller driver to honour it.
+#   Batching several chunks into one multi-segment message does not help
+#   here, as the bufsiz limit applies to the sum of all segments.
+#
+#   xferStream(txbuff) and readStream(size) are generators that yield the
+#   received data chunk by chunk, so large reads can be consumed
+#   incrementally without building up the whole result. With
+#   keepSelected=False CS is deselected between the chunks. While a stream
+#   with keepSelected=True is consumed no other transfer should be done on
+#   the same bus. The lock is only held while a chunk is transferred, each
+#   yielded chunk is a copy of the receive buffer, so no reference into the
+#   shared buffer is kept between the chunks.
 #
 
 import fcntl
 import array
 import ctypes
 import struct
+from threading import RLock
 
 from webiopi.utils.version import PYTHON_MAJOR
 from webiopi.devices.bus import Bus, SPI_Bus
@@ -72,6 +122,28 @@ SPI_MODE_3      = (SPI_CPOL|SPI_CPHA)
 
 SPI_IOC_MAGIC   = ord('k')
 
+# struct spi_ioc_transfer: tx_buf, rx_buf, len, speed_hz, delay_usecs,
+# bits_per_word, cs_change, tx_nbits, rx_nbits, word_delay_usecs, pad
+SPI_IOC_TRANSFER_FORMAT = "=QQIIHBBBBBB"
+SPI_IOC_TRANSFER_SIZE   = struct.calcsize(SPI_IOC_TRANSFER_FORMAT)
+
+SPI_DEFAULT_BUFFER_SIZE = 64
+
+# spidev module parameter limiting the size of one SPI message
+SPIDEV_BUFSIZ_FILE      = "/sys/module/spidev/parameters/bufsiz"
+SPIDEV_DEFAULT_BUFSIZ   = 4096
+BUFSIZ = None
+
+def getBufferSize():
+    global BUFSIZ
+    if BUFSIZ is None:
+        try:
+            with open(SPIDEV_BUFSIZ_FILE) as f:
+                BUFSIZ = int(f.read().strip())
+        except (IOError, ValueError):
+            BUFSIZ = SPIDEV_DEFAULT_BUFSIZ
+    return BUFSIZ
+
 def SPI_IOC_MESSAGE(count):
     return _IOW(SPI_IOC_MAGIC, 0, count)
 
@@ -92,6 +164,19 @@ SPI_IOC_WR_BITS_PER_WORD    = _IOW(SPI_IOC_MAGIC, 3, 1)
 SPI_IOC_RD_MAX_SPEED_HZ     = _IOR(SPI_IOC_MAGIC, 4, 4)
 SPI_IOC_WR_MAX_SPEED_HZ     = _IOW(SPI_IOC_MAGIC, 4, 4)
 
+class SPI_Segment():
+    def __init__(self, data=None, size=0, csChange=False, delay=0, speed=0, bits=0):
+        self.data = data
+        self.size = size if data is None else len(data)
+        self.csChange = csChange
+        self.delay = delay
+        self.speed = speed
+        self.bits = bits
+
+    def __str__(self):
+        return "SPI_Segment(size=%d)" % self.size
+
+
 class SPI_DEV(SPI_Bus):
     def __init__(self, dev, chip=0, mode=0, bits=8, speed=0):
         Bus.__init__(self, "SPIDEV", "/dev/" + dev + (".%d" % chip))
@@ -123,32 +208,178 @@ class SPI_DEV(SPI_Bus):
             raise Exception("Cannot read SPI Max speed")
         self.speed = struct.unpack('I', val32)[0]
         assert((self.speed == speed) or (speed == 0))
+
+        self.lock = RLock()
+        self._transfer = bytearray(SPI_IOC_TRANSFER_SIZE)
+        self._transfers = bytearray(SPI_IOC_TRANSFER_SIZE)
+        self._message = SPI_IOC_MESSAGE(SPI_IOC_TRANSFER_SIZE)
+        self._bufferSize = 0
+        self.__allocateBuffers__(SPI_DEFAULT_BUFFER_SIZE)
     
     def __str__(self):
         return "SPI_DEV(chip=%d, mode=%d, speed=%dHz)" % (self.chip, self.mode, self.speed)
         
     def xfer(self, txbuff=None):
-        length = len(txbuff)
+        if not isinstance(txbuff, (bytes, bytearray, memoryview)):
+            txbuff = bytearray(txbuff)
+        rxbuff = bytearray(len(txbuff))
+        self.xferInto(txbuff, rxbuff)
+        return rxbuff
+
+    def xferInto(self, txbuff, rxbuff=None):
+        txdata = self.__txData__(txbuff)
+        length = len(txdata)
+        with self.lock:
+            if length <= getBufferSize():
+                self.__xferChunk__(txdata, 0, length, 0)
+                if rxbuff is not None:
+                    self.__storeRx__(rxbuff, 0, length)
+            else:
+                offset = 0
+                while offset < length:
+                    chunk = self.__streamChunk__(txdata, offset, length, True)
+                    if rxbuff is not None:
+                        self.__storeRx__(rxbuff, offset, chunk)
+                    offset += chunk
+        return length
+
+#---------- Streaming transfers for payloads larger than the spidev bufsiz ----------
+
+    def xferStream(self, txbuff, keepSelected=True):
+        txdata = self.__txData__(txbuff)
+        return self.__stream__(txdata, len(txdata), keepSelected)
+
+    def readStream(self, size, keepSelected=True):
+        return self.__stream__(None, size, keepSelected)
+
+#---------- Multi-segment transfers ----------
+
+    def xferMulti(self, segments):
+        count = len(segments)
+        total = 0
+        for segment in segments:
+            total += segment.size
+        if total > getBufferSize():
+            raise Exception("Error: SPI_DEV multi-segment transfer can only transfer max %d bytes." % getBufferSize())
+        with self.lock:
+            return self.__xferMulti__(segments, count, total)
+
+#---------- Helpers ----------
+
+    def __xferMulti__(self, segments, count, total):
+        self.__ensureBuffers__(total)
+        self.__ensureTransfers__(count)
+
+        offset = 0
+        for i in range(count):
+            segment = segments[i]
+            length = segment.size
+            if segment.data is None:
+                txaddr = 0 # kernel clocks out zeros
+            else:
+                txaddr = self._txaddr + offset
+                if PYTHON_MAJOR >= 3:
+                    data = segment.data
+                    if not isinstance(data, (bytes, bytearray, memoryview)):
+                        data = bytearray(data)
+                    self._txview[offset:offset+length] = memoryview(data).cast('B')
+                else:
+                    ctypes.memmove(txaddr, str(bytearray(segment.data)), length)
+            self.__packTransfer__(self._transfers,
+                                  i * SPI_IOC_TRANSFER_SIZE,
+                                  txaddr,
+                                  self._rxaddr + offset,
+                                  length,
+                                  segment.speed or self.speed,
+                                  segment.delay,
+                                  segment.bits or self.bits,
+                                  1 if segment.csChange else 0)
+            offset += length
+
+        # the transfers buffer may be longer, the kernel only uses count structs
+        fcntl.ioctl(self.fd, SPI_IOC_MESSAGE(count * SPI_IOC_TRANSFER_SIZE), self._transfers)
+
+        results = []
+        offset = 0
+        for segment in segments:
+            results.append(bytearray(self._rxbuff[offset:offset+segment.size]))
+            offset += segment.size
+        return results
+
+    def __stream__(self, txdata, size, keepSelected):
+        offset = 0
+        while offset < size:
+            with self.lock:
+                length = self.__streamChunk__(txdata, offset, size, keepSelected)
+                chunk = bytearray(self._rxbuff[:length])
+            yield chunk
+            offset += length
+
+    def __streamChunk__(self, txdata, offset, size, keepSelected):
+        length = min(getBufferSize(), size - offset)
+        # cs_change on the last transfer of a message keeps CS selected
+        csChange = 1 if keepSelected and (offset + length < size) else 0
+        self.__xferChunk__(txdata, offset, length, csChange)
+        return length
+
+    def __xferChunk__(self, txdata, offset, length, csChange):
+        self.__ensureBuffers__(length)
+        if txdata is None:
+            txaddr = 0 # kernel clocks out zeros
+        else:
+            txaddr = self._txaddr
+            if PYTHON_MAJOR >= 3:
+                self._txview[:length] = txdata[offset:offset+length]
+            else:
+                ctypes.memmove(self._txbuff, txdata[offset:offset+length], length)
+        self.__packTransfer__(self._transfer, 0, txaddr, self._rxaddr, length, self.speed, 0, self.bits, csChange)
+        fcntl.ioctl(self.fd, self._message, self._transfer)
+
+    def __txData__(self, txbuff):
         if PYTHON_MAJOR >= 3:
-            _txbuff = bytes(txbuff)
-            _txptr = ctypes.create_string_buffer(_txbuff)
+            try:
+                return memoryview(txbuff).cast('B')
+            except TypeError: # e.g. lists of byte values
+                return memoryview(bytearray(txbuff)).cast('B')
+        return str(bytearray(txbuff))
+
+    def __storeRx__(self, rxbuff, offset, length):
+        if PYTHON_MAJOR >= 3:
+            memoryview(rxbuff).cast('B')[offset:offset+length] = self._rxview[:length]
         else:
-            _txbuff = str(bytearray(txbuff))
-            _txptr = ctypes.create_string_buffer(_txbuff)
-        _rxptr = ctypes.create_string_buffer(length)
-        
-        data = struct.pack("QQLLHBBL",  #64 64 32 32 16 8 8 32 b = 32B
-                    ctypes.addressof(_txptr),
-                    ctypes.addressof(_rxptr),
+            rxbuff[offset:offset+length] = bytearray(self._rxbuff.raw[:length])
+
+    def __packTransfer__(self, transfers, offset, txaddr, rxaddr, length, speed, delay, bits, csChange):
+        struct.pack_into(SPI_IOC_TRANSFER_FORMAT, transfers, offset,
+                    txaddr,
+                    rxaddr,
                     length,
-                    self.speed,
-                    0, #delay
-                    self.bits,
-                    0, # cs_change,
-                    0  # pad
+                    speed,
+                    delay,
+                    bits,
+                    csChange,
+                    0, 0, 0, 0 # tx_nbits, rx_nbits, word_delay, pad
                     )
-        
-        fcntl.ioctl(self.fd, SPI_IOC_MESSAGE(len(data)), data)
-        _rxbuff = ctypes.string_at(_rxptr, length)
-        return bytearray(_rxbuff)
-        
+
+    def __ensureTransfers__(self, count):
+        size = count * SPI_IOC_TRANSFER_SIZE
+        if size > len(self._transfers):
+            self._transfers = bytearray(size)
+
+    def __ensureBuffers__(self, length):
+        if length <= self._bufferSize:
+            return
+        size = max(self._bufferSize, SPI_DEFAULT_BUFFER_SIZE)
+        while size < length:
+            size *= 2
+        self.__allocateBuffers__(size)
+
+    def __allocateBuffers__(self, size):
+        self._txbuff = ctypes.create_string_buffer(size)
+        self._rxbuff = ctypes.create_string_buffer(size)
+        self._txaddr = ctypes.addressof(self._txbuff)
+        self._rxaddr = ctypes.addressof(self._rxbuff)
+        if PYTHON_MAJOR >= 3:
+            self._txview = memoryview(self._txbuff).cast('B')
+            self._rxview = memoryview(self._rxbuff).cast('B')
+        self._bufferSize = size
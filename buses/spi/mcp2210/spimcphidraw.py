@@ -15,7 +15,6 @@
 #   Derived from original WebIOPi SPI class 
 #   Implements SPI device connectivity using the MCP2210 USB <-> SPI chip
 #   Communicates via raw HID reports using the user space device node /dev/hidrawX
-#   This driver has the limitation of supporting max 60 bytes per SPI transfer
 #
 #   ----------------------------------------------------------------------------
 #
@@ -25,6 +24,14 @@
 #
 #   1.1    2016-06-22    Refactored for bus device indirection.
 #
+#   1.2    2026-10-17    Registry of opened MCP2210 adapters instead of singletons.
+#
+#   1.3    2026-10-17    Skip SPI settings reports that do not change anything.
+#
+#   1.4    2026-10-17    Transfers of up to 65535 bytes via multiple HID reports.
+#
+#   1.5    2026-10-17    Preallocated HID report buffers per adapter.
+#
 #   Implementation and usage remarks
 #
 #   Implements SPI device connectivity using the MCP2210 USB <-> SPI chip.
@@ -34,25 +41,47 @@
 #   may also change on behalf of the OS and its numbering algorithms between reboots.
 #   This driver makes the assumption that the MCP2210 gets recognized automatically
 #   by the OS as a HID device and attached to the raw OS HID drivers.
-#   This driver has the current limitation of supporting max 60 bytes per single
-#   SPI transfer which in most cases does not matter as typically only a few bytes
-#   are transferred.
+#   SPI transfers can have up to 65535 bytes. The transfer size is set once for
+#   the whole transfer, then the data is sent in transfer reports of 60 bytes each
+#   and the received data is collected into one preallocated bytearray. Reports not
+#   accepted because the MCP2210 is still busy with the previous ones are resent.
 #
 #   SPI standard communication methods are secured by mutual locking to avoid concurent
 #   SPI communication via the same /dev/hidrawX node when multiple SPI chips are
 #   connected to the same MCP2210 and concurrent request occur via the REST API.
 #
+#   Each /dev/hidrawX node is opened once for all SPI chips connected to that MCP2210
+#   and closed when the last one is closed. Each MCP2210 has its own lock, so
+#   several MCP2210 adapters can be used in parallel within one process.
+#
+#   The SPI settings (bit rate, chip select, delays, transfer size and mode) last
+#   applied to an MCP2210 are kept per adapter. A set SPI settings report is only
+#   sent when the settings of the next transfer differ, so consecutive transfers
+#   of the same size to the same chip need just one HID report each. A reset of
+#   the SPI transfer or a failed settings report discard the kept settings.
+#
+#   Each MCP2210 adapter has one preallocated request and one response report
+#   buffer that are reused for all HID reports while holding the adapter lock.
+#   Responses are read directly into the response buffer (via os.readv where
+#   available). Debug messages of HID reports are only formatted when debug
+#   logging is enabled.
+#
 #   If chip = -1 is used, ALL CS outputs (CS0..CS7) are tied to low, CS8 is omitted.
 #
 
-from webiopi.devices.bus import SPI_Bus
-from webiopi.utils.logger import debug, info
-from threading import Lock
+from webiopi.devices.bus import Bus, SPI_Bus
+from webiopi.devices.buses.adapters import Adapter, AdapterRegistry
+from webiopi.utils.logger import debug, debugEnabled, info
 import os
 
 #HID report sizes
 MCP_HID_REPORT_SIZE           = 64
 MCP_MAX_TRANSFER_BYTES        = 60
+MCP_MAX_SPI_TRANSFER_BYTES    = 65535
+MCP_EMPTY_REPORT              = bytes(bytearray(MCP_HID_REPORT_SIZE))
+
+#Number of resends of transfer reports rejected by a busy MCP2210
+MCP_MAX_RETRIES               = 20
 
 #HID report commands
 MCP_COMMAND_CANCEL_SPI_TRANSFER = 0x11
@@ -62,6 +91,8 @@ MCP_COMMAND_TRANSFER_SPI_DATA   = 0x42
 
 #HID report subcommands
 MCP_COMMAND_OK                = 0x00
+MCP_SPI_BUS_NOT_AVAILABLE     = 0xF7
+MCP_SPI_TRANSFER_IN_PROGRESS  = 0xF8
 MCP_SPI_TRANSFER_STARTING     = 0x20
 MCP_SPI_TRANSFER_FINISHED     = 0x10
 MCP_SPI_TRANSFER_NOT_FINISHED = 0x30
@@ -99,12 +130,12 @@ MCP_SPI_SPI_MODE              = 20
 #MCP chip settings
 MCP_CS                        = 0x01
     
-#Singletons
-MCPLOCK = None
-FD = 0
+#Registry of opened MCP2210 adapters
+ADAPTERS = AdapterRegistry()
 
 class SPI_MCP2210_HIDRAW(SPI_Bus):
     def __init__(self, dev, chip=0, mode=0, bits=8, speed=0):
+        self.adapter = None
         Bus.__init__(self, "SPI", "/dev/" + dev)
         
         self.chip = chip
@@ -114,58 +145,85 @@ class SPI_MCP2210_HIDRAW(SPI_Bus):
         self.data_to_cs_delay = 0
         self.between_data_delay = 0
 
-        global MCPLOCK
-        if MCPLOCK is None:
-            MCPLOCK = Lock()
-
         debug("Attached SPI device - SPI_MCP2210_HIDRAW(class=%s chip=%d speed=%d dev=%s fd=%d)"  % (self.__class__.__name__, self.chip, self.speed, self.device, self.fd))
         
     def __str__(self):
         return "SPI_MCP2210_HIDRAW(chip=%d)" % self.chip
 
-#---------- BUS open() and close() reimplementation to handle file descriptor singleton ----------
+#---------- BUS open() and close() reimplementation to share one file descriptor per adapter ----------
 
     def open(self):
-        global FD
-        if FD == 0:
-            debug("Opening SPI bus device - SPI_MCP2210_HIDRAW(dev=%s)"  % self.device)
-            self.fd = os.open(self.device, self.flag)
-            if self.fd < 0:
-                raise Exception("Cannot open %s" % self.device)
-            FD = self.fd
-            #self.setChipSettings() # uncomment when setting the chip settings is necessary at runtime
-            self.resetSPITransfer()
-
-        else:
-            self.fd = FD
+        self.adapter = ADAPTERS.acquire(self.device, self.__openAdapter__)
+        self.fd = self.adapter.fd
 
     def close(self):
-        global FD
-        if FD > 0:
+        if self.adapter is not None:
+            ADAPTERS.release(self.device, self.__closeAdapter__)
+            self.adapter = None
+            self.fd = 0
+
+    def __openAdapter__(self, device):
+        debug("Opening SPI bus device - SPI_MCP2210_HIDRAW(dev=%s)"  % device)
+        self.fd = os.open(device, self.flag)
+        if self.fd < 0:
+            raise Exception("Cannot open %s" % device)
+        self.adapter = Adapter(device, self.fd)
+        self.adapter.spiSettings = None
+        self.adapter.wbuff = bytearray(MCP_HID_REPORT_SIZE)
+        self.adapter.rbuff = bytearray(MCP_HID_REPORT_SIZE)
+        #self.setChipSettings() # uncomment when setting the chip settings is necessary at runtime
+        self.resetSPITransfer()
+        return self.adapter
+
+    def __closeAdapter__(self, adapter):
+        with adapter.lock:
+            self.adapter = adapter
             self.resetSPITransfer()
-            debug("Closing SPI bus device - SPI_MCP2210_HIDRAW(dev=%s)"  % self.device)
-            os.close(FD)
-            FD = 0
+            debug("Closing SPI bus device - SPI_MCP2210_HIDRAW(dev=%s)"  % adapter.device)
+            os.close(adapter.fd)
 
 #---------- SPI abstraction communication methods secured by mutual locking ----------
 
     def xfer(self, txbuff=None):
-        global MCPLOCK
         size = len(txbuff)
-        debug("%s xfer txsize=%d" % (self.__str__(), size))
+        if size > MCP_MAX_SPI_TRANSFER_BYTES:
+            raise Exception("Error: MCP SPI driver can only transfer max %d bytes." % MCP_MAX_SPI_TRANSFER_BYTES)
+        if debugEnabled():
+            debug("%s xfer txsize=%d" % (self.__str__(), size))
 
-        with MCPLOCK:
+        response = bytearray(size)
+        with self.adapter.lock:
             self.setSPISettings(size)
-            response = self.sendXferCommand(txbuff)
-            # If not all bytes are received, do re-sending of nothing until needed bytes are received)
-            while len(response) < len(txbuff):
-                response += self.sendXferCommand()
-
-        return bytearray(response)
+            wbuff = self.__newReport__(MCP_COMMAND_TRANSFER_SPI_DATA)
+            sent = 0
+            received = 0
+            retries = 0
+            # Send data in chunks, then re-send nothing until all bytes are received
+            while received < size:
+                chunk = min(MCP_MAX_TRANSFER_BYTES, size - sent)
+                wbuff[MCP_SPI_TX_SIZE] = chunk
+                wbuff[MCP_SPI_DATA_START:MCP_SPI_DATA_START+chunk] = txbuff[sent:sent+chunk]
+                rbuff = self.__sendXferReport__(wbuff)
+                if rbuff[MCP_SPI_RESULT_ERROR] == MCP_SPI_TRANSFER_IN_PROGRESS:
+                    retries += 1
+                    if retries > MCP_MAX_RETRIES:
+                        self.resetSPITransfer()
+                        raise Exception("Error: MCP SPI driver is busy and cannot accept SPI data.")
+                    continue
+                if rbuff[MCP_SPI_RESULT_ERROR] != MCP_COMMAND_OK:
+                    self.resetSPITransfer()
+                    raise Exception("Error: MCP SPI driver cannot accept SPI data.")
+                retries = 0
+                sent += chunk
+                rsize = min(rbuff[MCP_SPI_RECEIVED_BYTES], size - received)
+                response[received:received+rsize] = rbuff[MCP_SPI_DATA_START:MCP_SPI_DATA_START+rsize]
+                received += rsize
+
+        return response
 
     def writeBytes(self, data):
-        size = len(data)
-        debug("%s write size=%d" % (self.__str__(), size))
+        if debugEnabled():
+            debug("%s write size=%d" % (self.__str__(), len(data)))
         #at the bottom line, writeBytes does the same as xfer, so just delegate
         self.xfer(data)
 
@@ -176,29 +234,50 @@ class SPI_MCP2210_HIDRAW(SPI_Bus):
         if size > MCP_MAX_TRANSFER_BYTES:
             raise Exception("Error: MCP SPI driver can only write max %d bytes." % MCP_MAX_TRANSFER_BYTES)
 
-        debug("%s sendXfer sendsize=%d" % (self.__str__(), size))
+        if debugEnabled():
+            debug("%s sendXfer sendsize=%d" % (self.__str__(), size))
 
-        wbuff = bytearray(MCP_HID_REPORT_SIZE)
-        wbuff[MCP_SPI_COMMAND] = MCP_COMMAND_TRANSFER_SPI_DATA
-        wbuff[MCP_SPI_TX_SIZE] = size
-        for i in range(size):
-            wbuff[i+MCP_SPI_DATA_START] = data[i]
-        self.write(wbuff)
+        with self.adapter.lock:
+            wbuff = self.__newReport__(MCP_COMMAND_TRANSFER_SPI_DATA)
+            wbuff[MCP_SPI_TX_SIZE] = size
+            wbuff[MCP_SPI_DATA_START:MCP_SPI_DATA_START+size] = data
+            rbuff = self.__sendXferReport__(wbuff)
+
+            if (rbuff[MCP_SPI_COMMAND] == MCP_COMMAND_TRANSFER_SPI_DATA) & (rbuff[MCP_SPI_RESULT_ERROR] != MCP_COMMAND_OK):
+                raise Exception("Error: MCP SPI driver cannot accept SPI data.")
 
-        rbuff = bytearray(self.read(MCP_HID_REPORT_SIZE))
+            rsize = rbuff[MCP_SPI_RECEIVED_BYTES]
+            return rbuff[MCP_SPI_DATA_START:MCP_SPI_DATA_START+rsize]
 
-        state = self.calculateState(rbuff[MCP_SPI_ENGINE_STATUS])
-        debug("%s transfer_spi_data_received: 0x%02X, 0x%02X, got=%d, %s, [0x%02X, 0x%02X, 0x%02X, 0x%02X]" % (self.__str__(),rbuff[0],rbuff[1],rbuff[2],state,rbuff[4],rbuff[5],rbuff[6],rbuff[7]))
+#---------- HID report helpers, to be used while holding the adapter lock ----------
 
-        if (rbuff[MCP_SPI_COMMAND] == MCP_COMMAND_TRANSFER_SPI_DATA) & (rbuff[MCP_SPI_RESULT_ERROR] != MCP_COMMAND_OK):
-            raise Exception("Error: MCP SPI driver cannot accept SPI data.")
+    def __newReport__(self, command):
+        wbuff = self.adapter.wbuff
+        wbuff[:] = MCP_EMPTY_REPORT
+        wbuff[MCP_SPI_COMMAND] = command
+        return wbuff
 
-        rsize = rbuff[MCP_SPI_RECEIVED_BYTES]                 
-        return rbuff[MCP_SPI_DATA_START:MCP_SPI_DATA_START+rsize]
+    def __readReport__(self):
+        rbuff = self.adapter.rbuff
+        if hasattr(os, "readv"):
+            os.readv(self.fd, [rbuff])
+        else:
+            data = self.read(MCP_HID_REPORT_SIZE)
+            rbuff[:len(data)] = data
+        return rbuff
+
+    def __sendXferReport__(self, wbuff):
+        self.write(wbuff)
+
+        rbuff = self.__readReport__()
+
+        if debugEnabled():
+            state = self.calculateState(rbuff[MCP_SPI_ENGINE_STATUS])
+            debug("%s transfer_spi_data_received: 0x%02X, 0x%02X, got=%d, %s, [0x%02X, 0x%02X, 0x%02X, 0x%02X]" % (self.__str__(),rbuff[0],rbuff[1],rbuff[2],state,rbuff[4],rbuff[5],rbuff[6],rbuff[7]))
+        return rbuff
                 
     def setSPISettings(self, size=0):
-        wbuff = bytearray(MCP_HID_REPORT_SIZE)
-        wbuff[MCP_SPI_COMMAND] = MCP_COMMAND_SET_SPI_SETTINGS
+        wbuff = self.__newReport__(MCP_COMMAND_SET_SPI_SETTINGS)
         
         speedByte3, speedByte2, speedByte1, speedByte0 = self.getBitRate(self.speed)
         wbuff[MCP_SPI_BIT_RATE_BYTE_3]    = speedByte3
@@ -224,20 +303,25 @@ class SPI_MCP2210_HIDRAW(SPI_Bus):
 
         wbuff[MCP_SPI_SPI_MODE] = self.mode
 
+        if self.adapter.spiSettings == wbuff:
+            return
+        self.adapter.spiSettings = None
+
         self.write(wbuff)
         
-        rbuff = bytearray(self.read(MCP_HID_REPORT_SIZE))
+        rbuff = self.__readReport__()
 
-        bitrate = self.calculateBitRate(rbuff[MCP_SPI_BIT_RATE_BYTE_3],rbuff[MCP_SPI_BIT_RATE_BYTE_2],rbuff[MCP_SPI_BIT_RATE_BYTE_1],rbuff[MCP_SPI_BIT_RATE_BYTE_0])
-        idle, active = self.calculateChipSelects(rbuff[MCP_SPI_CS_IDLE_LOW],rbuff[MCP_SPI_CS_IDLE_HIGH],rbuff[MCP_SPI_CS_ACTIVE_LOW],rbuff[MCP_SPI_CS_ACTIVE_HIGH])
-        debug("%s set_spi_settings_received: 0x%02X, 0x%02X, speed=%d, idle_cs=%s, active_CS=%s" % (self.__str__(),rbuff[0],rbuff[1],bitrate,idle,active))
+        if debugEnabled():
+            bitrate = self.calculateBitRate(rbuff[MCP_SPI_BIT_RATE_BYTE_3],rbuff[MCP_SPI_BIT_RATE_BYTE_2],rbuff[MCP_SPI_BIT_RATE_BYTE_1],rbuff[MCP_SPI_BIT_RATE_BYTE_0])
+            idle, active = self.calculateChipSelects(rbuff[MCP_SPI_CS_IDLE_LOW],rbuff[MCP_SPI_CS_IDLE_HIGH],rbuff[MCP_SPI_CS_ACTIVE_LOW],rbuff[MCP_SPI_CS_ACTIVE_HIGH])
+            debug("%s set_spi_settings_received: 0x%02X, 0x%02X, speed=%d, idle_cs=%s, active_CS=%s" % (self.__str__(),rbuff[0],rbuff[1],bitrate,idle,active))
 
         if (rbuff[MCP_SPI_COMMAND] == MCP_COMMAND_SET_SPI_SETTINGS) & (rbuff[MCP_SPI_RESULT_ERROR] != MCP_COMMAND_OK):
             raise Exception("Error: MCP SPI driver cannot accept SPI settings data.")
+        self.adapter.spiSettings = bytes(wbuff)
 
     def setChipSettings(self):
-        wbuff = bytearray(MCP_HID_REPORT_SIZE)
-        wbuff[MCP_SPI_COMMAND] = MCP_COMMAND_SET_CHIP_SETTINGS
+        wbuff = self.__newReport__(MCP_COMMAND_SET_CHIP_SETTINGS)
         
         for i in range(4,12): #Enable CS0 to CS7, don't use CS8
             wbuff[i] = MCP_CS
@@ -246,19 +330,19 @@ class SPI_MCP2210_HIDRAW(SPI_Bus):
 
         self.write(wbuff)
         
-        rbuff = bytearray(self.read(MCP_HID_REPORT_SIZE))
+        rbuff = self.__readReport__()
 
         if (rbuff[MCP_SPI_COMMAND] == MCP_COMMAND_SET_CHIP_SETTINGS) & (rbuff[MCP_SPI_RESULT_ERROR] != MCP_COMMAND_OK):
             raise Exception("Error: MCP SPI driver cannot accept chip settings data.")
         debug("Setted SPI bus device chip settings - SPI_MCP2210_HIDRAW(dev=%s)"  % self.hidChannel)
 
     def resetSPITransfer(self):
-        wbuff = bytearray(MCP_HID_REPORT_SIZE)
-        wbuff[MCP_SPI_COMMAND] = MCP_COMMAND_CANCEL_SPI_TRANSFER
+        wbuff = self.__newReport__(MCP_COMMAND_CANCEL_SPI_TRANSFER)
+        self.adapter.spiSettings = None
         
         self.write(wbuff)
         
-        rbuff = bytearray(self.read(MCP_HID_REPORT_SIZE))
+        rbuff = self.__readReport__()
 
         if (rbuff[MCP_SPI_COMMAND] == MCP_COMMAND_SET_CHIP_SETTINGS) & (rbuff[MCP_SPI_RESULT_ERROR] != MCP_COMMAND_OK):
             raise Exception("Error: MCP SPI driver cannot reset SPI transfer.")
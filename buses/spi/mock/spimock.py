@@ -27,6 +27,13 @@
 #   1.3    2016-08-29    Bugfix concat error for writeBytes.
 #                        Make all results consistent to be bytearrays.
 #
+#   1.4    2026-10-17    Built-in ring buffer FIFOs with scripted responses and
+#                        bus timing model.
+#
+#   1.5    2026-10-17    Bus timing model only enabled via timing:true.
+#
+#   1.6    2026-10-17    Scripted responses found for str data on Python 2.
+#
 #   Implementation and usage remarks
 #
 #   Version for SPI simulation using Memory class.
@@ -43,28 +50,90 @@
 #   enough bytes to fulfill the longest singular read and write (or xfer)
 #   requests.
 #
+#   Alternatively, built-in FIFOs can be used by setting the fifo: parameter to
+#   the FIFO capacity in bytes, e.g. fifo:4096. No memory devices are needed then
+#   and each transfer only touches the transferred bytes. All SPI_MOCK instances
+#   for the same <dev> share the FIFOs:
+#
+#   - MOSI: everything written by the master is appended, the oldest bytes are
+#     dropped when full. readSent() consumes it, e.g. to check driver output.
+#   - MISO: readBytes() and xfer() consume it, missing bytes are read as 0x00.
+#     queueResponse() appends bytes to it.
+#   - setResponse(command, response) scripts the slave. Each write or xfer that
+#     starts with the command byte appends response to MISO, so xfer() returns
+#     the response in the same transfer and readBytes() after writeBytes() gets
+#     it as well. response can also be a function that gets the written bytes
+#     and returns the response bytes.
+#
+#   Example (MCP4XXX0 read of wiper 0 returns 0x00 0x80):
+#
+#   spi = SPI_MOCK(dev="mcp", fifo=256)
+#   spi.setResponse(0x0C, [0x00, 0x80])
+#
+#   Optionally, the timing of a real SPI bus is simulated by setting timing:true.
+#   The simulated bus uses the speed: (bus clock in Hz) and latency: (seconds per
+#   transfer) parameters (see MockTiming), speed: alone does not slow down the
+#   mock. All instances for the same <dev> share one simulated bus, its parameters
+#   are taken from the first instance with timing:true, e.g.
+#
+#   spi0 = SPI_MOCK dev:mcp fifo:256 speed:1000000 latency:0.0001 timing:true
+#
 
 import webiopi
 from webiopi.devices.bus import Bus, SPI_Bus
+from webiopi.devices.buses.mocktiming import MockTiming
+from webiopi.devices.buses.ringbuffer import RingBuffer
+from webiopi.utils.types import toint, str2bool
 from webiopi.utils.logger import debug, info
+from threading import Lock
+
+#Built-in FIFOs and timing models per dev
+FIFOS = {}
+TIMINGS = {}
+MOCKLOCK = Lock()
+
+
+class SPI_MockFIFOs():
+    def __init__(self, capacity):
+        self.mosi = RingBuffer(capacity)
+        self.miso = RingBuffer(capacity)
+        self.responses = {}
+        self.lock = Lock()
+
 
 class SPI_MOCK(SPI_Bus):
-    def __init__(self, dev="", chip=0, mode=0, bits=8, speed=0):
+    def __init__(self, dev="", chip=0, mode=0, bits=8, speed=0, fifo=0, latency=0, timing=False):
         Bus.__init__(self, "SPI", "mock:%s" % dev)        
+        self.dev = dev
 
-        mockMemoryNameSI = "%s_si" % dev
-        self._memorySI = webiopi.deviceInstance(mockMemoryNameSI)
-        self._hasMockSI = self._memorySI != None
+        capacity = toint(fifo)
+        if capacity > 0:
+            self._fifos = self.__fifos__(capacity)
+            self._memorySI = None
+            self._memorySO = None
+        else:
+            self._fifos = None
+            mockMemoryNameSI = "%s_si" % dev
+            self._memorySI = webiopi.deviceInstance(mockMemoryNameSI)
 
-        mockMemoryNameSO = "%s_so" % dev
-        self._memorySO = webiopi.deviceInstance(mockMemoryNameSO)
+            mockMemoryNameSO = "%s_so" % dev
+            self._memorySO = webiopi.deviceInstance(mockMemoryNameSO)
+        self._hasMockSI = self._memorySI != None
         self._hasMockSO = self._memorySO != None
+
+        if str2bool(timing):
+            self._timing = self.__timing__(toint(speed), toint(bits), float(latency))
+        else:
+            self._timing = None
         
         debug("Mapped SPI bus device - %s" % self.__str__())
    
     def __str__(self):
         return "SPI_MOCK(dev=%s)" % self.device
 
+    def timing(self):
+        return self._timing
+
 #---------- Bus abstraction methods reimplementation ----------
 
     def open(self):
@@ -76,6 +145,13 @@ class SPI_MOCK(SPI_Bus):
 #---------- SPI abstraction communication methods redirected to reading/writing simulation memory ----------
     
     def readBytes(self, size=1):
+        if self._timing is not None:
+            self._timing.transfer(size)
+        if self._fifos is not None:
+            result = bytearray(size)
+            with self._fifos.lock:
+                self._fifos.miso.readinto(result)
+            return result
         if self._hasMockSO:
             currentBytes = self._memorySO.readMemoryBytes()
             result = currentBytes[:size]
@@ -87,7 +163,12 @@ class SPI_MOCK(SPI_Bus):
             return bytearray(size)
 
     def writeBytes(self, data):
-        if self._hasMockSI:
+        if self._timing is not None:
+            self._timing.transfer(len(data))
+        if self._fifos is not None:
+            with self._fifos.lock:
+                self.__writeFIFOs__(data)
+        elif self._hasMockSI:
             slots = self._memorySI.byteCount()
             currentBytes = self._memorySI.readMemoryBytes()
             allBytes = bytearray(data) + bytearray(currentBytes)
@@ -95,6 +176,74 @@ class SPI_MOCK(SPI_Bus):
         
     def xfer(self, txbuff=None):
         length = len(txbuff)
+        if self._fifos is not None:
+            if self._timing is not None:
+                self._timing.transfer(length)
+            result = bytearray(length)
+            with self._fifos.lock:
+                self.__writeFIFOs__(txbuff)
+                self._fifos.miso.readinto(result)
+            return result
         self.writeBytes(txbuff)
         return self.readBytes(length)
-        
+
+#---------- Slave side of the built-in FIFOs ----------
+
+    def setResponse(self, command, response):
+        self.__checkFIFOs__()
+        with self._fifos.lock:
+            if callable(response):
+                self._fifos.responses[command] = response
+            else:
+                self._fifos.responses[command] = bytearray(response)
+
+    def clearResponses(self):
+        self.__checkFIFOs__()
+        with self._fifos.lock:
+            self._fifos.responses.clear()
+
+    def queueResponse(self, data):
+        self.__checkFIFOs__()
+        with self._fifos.lock:
+            self._fifos.miso.write(bytearray(data), overwrite=True)
+
+    def readSent(self, size=-1):
+        self.__checkFIFOs__()
+        with self._fifos.lock:
+            return self._fifos.mosi.read(size)
+
+#---------- Helpers ----------
+
+    def __fifos__(self, capacity):
+        with MOCKLOCK:
+            fifos = FIFOS.get(self.dev)
+            if fifos is None:
+                fifos = SPI_MockFIFOs(capacity)
+                FIFOS[self.dev] = fifos
+            return fifos
+
+    def __timing__(self, clock, bits, latency):
+        with MOCKLOCK:
+            timing = TIMINGS.get(self.dev)
+            if timing is None:
+                timing = MockTiming(clock, bits, 0, latency)
+                TIMINGS[self.dev] = timing
+        if not timing.isEnabled():
+            return None
+        return timing
+
+    def __checkFIFOs__(self):
+        if self._fifos is None:
+            raise Exception("Error: %s has no built-in FIFOs (fifo:<capacity>)" % self.__str__())
+
+    def __writeFIFOs__(self, data):
+        fifos = self._fifos
+        if not isinstance(data, bytearray):
+            data = bytearray(data)
+        fifos.mosi.write(data, overwrite=True)
+        if (len(data) > 0) and (len(fifos.responses) > 0):
+            response = fifos.responses.get(data[0])
+            if response is not None:
+                if callable(response):
+                    response = bytearray(response(data))
+                fifos.miso.write(response, overwrite=True)
@@ -19,19 +19,56 @@
 #
 #   1.1    2016-06-28    Patched version for bus selection. Renamed from serial.py
 #                        to avoid naming conflicts with new abstract serial device.
+#   1.2    2026-10-17    Added asyncio integration with ring buffer.
+#   1.3    2026-10-17    Stop reading at end of file, check attach() in drain().
+#
+#   Implementation and usage remarks
+#
+#   attach(loop) registers the tty file descriptor at an asyncio event loop.
+#   Incoming bytes are drained by the loop into a fixed-size ring buffer as
+#   soon as the tty becomes readable, so no polling of available() is needed.
+#   Afterwards these methods return futures that can be awaited:
+#
+#   - readExactly(size) resolves with exactly size bytes.
+#   - readUntil(sep) resolves with all bytes up to and including sep.
+#   - drain() resolves as soon as all data of writeAsync() has been written.
+#
+#   writeAsync(data) writes without blocking, remaining bytes are written by
+#   the event loop when the tty accepts more data. When the ring buffer is
+#   full, reading from the tty pauses until the buffered data is consumed.
+#   At end of file (e.g. an unplugged USB serial adapter) reading stops and
+#   all waiting and further reads fail with an exception. detach() unregisters
+#   from the event loop. Example:
+#
+#   bus.attach(loop)
+#   bus.writeAsync(b"$PMTK000*32\r\n")
+#   await bus.drain()
+#   line = await bus.readUntil(b"\r\n")
+#
+#   The asyncio integration works with Python 3 only.
 #
 
 
 import os
+import errno
 import fcntl
 import struct
 import termios
+from collections import deque
 
 from webiopi.devices.bus import Bus, UART_Bus
+from webiopi.devices.buses.ringbuffer import RingBuffer
+
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
 
 TIOCINQ   = hasattr(termios, 'FIONREAD') and termios.FIONREAD or 0x541B
 TIOCM_zero_str = struct.pack('I', 0)
 
+UART_RING_BUFFER_SIZE = 4096
+
 class UART_DEV(UART_Bus):
     def __init__(self, dev, baudrate):
         if not dev.startswith("/dev/"):
@@ -70,6 +107,8 @@ class UART_DEV(UART_Bus):
         options[5] = speed
         
         termios.tcsetattr(self.fd, termios.TCSADRAIN, options)
+
+        self.loop = None
         
     def __str__(self):
         return "UART_DEV(%dbps)" % self.baudrate
@@ -77,4 +116,147 @@ class UART_DEV(UART_Bus):
     def available(self):
         s = fcntl.ioctl(self.fd, TIOCINQ, TIOCM_zero_str)
         return struct.unpack('I',s)[0]
-    
+
+#---------- asyncio integration ----------
+
+    def attach(self, loop=None, capacity=UART_RING_BUFFER_SIZE):
+        if asyncio is None:
+            raise Exception("asyncio is not available for %s" % self.__str__())
+        if self.loop is not None:
+            raise Exception("%s is already attached to an event loop" % self.__str__())
+        self.loop = loop if loop is not None else asyncio.get_event_loop()
+        self.ring = RingBuffer(capacity)
+        self.readers = deque()
+        self.pending = bytearray()
+        self.drainers = []
+        self.reading = False
+        self.eof = False
+        self.__startReading__()
+
+    def detach(self):
+        if self.loop is None:
+            return
+        self.__stopReading__()
+        if len(self.pending) > 0:
+            self.loop.remove_writer(self.fd)
+        for (future, size, sep) in self.readers:
+            if not future.done():
+                future.cancel()
+        for future in self.drainers:
+            if not future.done():
+                future.cancel()
+        self.loop = None
+
+    def close(self):
+        self.detach()
+        UART_Bus.close(self)
+
+    def readExactly(self, size):
+        return self.__addReader__(size, None)
+
+    def readUntil(self, sep=b"\n"):
+        return self.__addReader__(0, bytes(sep))
+
+    def writeAsync(self, data):
+        if self.loop is None:
+            raise Exception("%s is not attached to an event loop" % self.__str__())
+        if len(self.pending) == 0:
+            try:
+                written = os.write(self.fd, data)
+            except OSError as e:
+                if e.errno not in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    raise
+                written = 0
+            if written == len(data):
+                return
+            self.pending += data[written:]
+            self.loop.add_writer(self.fd, self.__onWritable__)
+        else:
+            self.pending += data
+
+    def drain(self):
+        if self.loop is None:
+            raise Exception("%s is not attached to an event loop" % self.__str__())
+        future = self.loop.create_future()
+        if len(self.pending) == 0:
+            future.set_result(None)
+        else:
+            self.drainers.append(future)
+        return future
+
+#---------- asyncio helpers ----------
+
+    def __addReader__(self, size, sep):
+        if self.loop is None:
+            raise Exception("%s is not attached to an event loop" % self.__str__())
+        future = self.loop.create_future()
+        self.readers.append((future, size, sep))
+        self.__serveReaders__()
+        return future
+
+    def __startReading__(self):
+        if not (self.reading or self.eof):
+            self.loop.add_reader(self.fd, self.__onReadable__)
+            self.reading = True
+
+    def __stopReading__(self):
+        if self.reading:
+            self.loop.remove_reader(self.fd)
+            self.reading = False
+
+    def __onReadable__(self):
+        if (self.ring.free() > 0) and (self.ring.readFrom(self.fd, -1) == 0):
+            # readable without data is end of file, the fd would stay readable forever
+            self.eof = True
+            self.__stopReading__()
+        self.__serveReaders__()
+        if self.ring.isFull():
+            self.__stopReading__()
+
+    def __serveReaders__(self):
+        while len(self.readers) > 0:
+            (future, size, sep) = self.readers[0]
+            if future.done():
+                self.readers.popleft()
+                continue
+            if sep is None:
+                if size > self.ring.capacity:
+                    self.readers.popleft()
+                    future.set_exception(Exception("Read size %d exceeds ring buffer capacity %d" % (size, self.ring.capacity)))
+                    continue
+                if len(self.ring) < size:
+                    break
+            else:
+                index = self.ring.find(sep)
+                if index < 0:
+                    if self.ring.isFull():
+                        self.readers.popleft()
+                        future.set_exception(Exception("Separator not found in full ring buffer"))
+                        continue
+                    break
+                size = index + len(sep)
+            self.readers.popleft()
+            future.set_result(bytes(self.ring.read(size)))
+        if self.eof:
+            while len(self.readers) > 0:
+                (future, size, sep) = self.readers.popleft()
+                if not future.done():
+                    future.set_exception(Exception("End of file on %s" % self.__str__()))
+        elif not self.ring.isFull():
+            self.__startReading__()
+
+    def __onWritable__(self):
+        try:
+            written = os.write(self.fd, self.pending)
+        except OSError as e:
+            if e.errno not in (errno.EAGAIN, errno.EWOULDBLOCK):
+                raise
+            written = 0
+        del self.pending[:written]
+        if len(self.pending) == 0:
+            self.loop.remove_writer(self.fd)
+            drainers = self.drainers
+            self.drainers = []
+            for future in drainers:
+                if not future.done():
+                    future.set_result(None)
@@ -17,26 +17,88 @@
 #   Changelog
 #
 #   1.0    2016-06-30    Initial release.
+#   1.1    2026-10-17    Added read() and write() for bytes.
+#   1.2    2026-10-17    Bytes ring buffer, linked pairs and baudrate pacing.
+#   1.3    2026-10-17    Baudrate pacing only enabled via pacing:true, readString()
+#                        returns str on Python 2.
 #
 #   Implementation and usage remarks
 #
-#   Version for UART simulation using an internal string object.
-#   Writing appends the new string to the existing string.
-#   Reading consumes (reduces) the existing string.
+#   Version for UART simulation using a bounded bytes ring buffer (see
+#   RingBuffer) of buffersize bytes per <dev>. All UART_MOCK instances for the
+#   same <dev> share the receive ring buffer of that <dev>.
+#   Writing appends the new bytes to the receive ring buffer, bytes that do not
+#   fit are dropped like on a real UART overrun and counted in dropped().
+#   Reading consumes the received bytes.
+#   readString() and writeString() map the characters of the string 1:1 to
+#   bytes (latin-1). With Python 2 readString() returns the bytes as str like
+#   the other UART bus devices.
+#
+#   Without the link: parameter the mock is a loopback, the written bytes are
+#   read back by the same <dev>. With link: the written bytes are received by
+#   the <dev> named by link:, so two mocks linked to each other behave like two
+#   endpoints of a serial line (e.g. a driver and an emulator of its device).
+#
+#   Example:
+#   [BUSES]
+#   uarta = UART_MOCK dev:a link:b baudrate:115200 pacing:true
+#   uartb = UART_MOCK dev:b link:a baudrate:115200 pacing:true
+#
+#   If pacing:true and a baudrate are given, writing is paced to the throughput
+#   of a serial line with 10 bits per byte (start bit, 8 data bits, stop bit, see
+#   MockTiming). Without pacing:true the baudrate: parameter does not slow down
+#   the mock.
 #
 
 from webiopi.devices.bus import Bus, UART_Bus
+from webiopi.devices.buses.mocktiming import MockTiming
+from webiopi.devices.buses.ringbuffer import RingBuffer
+from webiopi.utils.types import toint, str2bool
 from webiopi.utils.logger import debug, info
+from webiopi.utils.version import PYTHON_MAJOR
+from threading import Lock
+
+UART_MOCK_BUFFER_SIZE  = 4096
+UART_MOCK_BITS_PER_BYTE = 10 # start bit, 8 data bits, stop bit
+
+#Receive ring buffers per dev
+CHANNELS = {}
+MOCKLOCK = Lock()
+
+
+class UART_MockChannel():
+    def __init__(self, capacity):
+        self.ring = RingBuffer(capacity)
+        self.lock = Lock()
+        self.dropped = 0
+
 
 class UART_MOCK(UART_Bus):
-    def __init__(self, dev="uart", baudrate=None):
+    def __init__(self, dev="uart", baudrate=None, link=None, buffersize=UART_MOCK_BUFFER_SIZE, pacing=False):
         Bus.__init__(self, "UART", "mock:%s" % dev, None)
-        self.string = ""
+        self.dev = dev
+        self.link = link
+        capacity = toint(buffersize)
+        self.rx = self.__channel__(dev, capacity)
+        if link is None:
+            self.tx = self.rx
+        else:
+            self.tx = self.__channel__(link, capacity)
+
+        self.baudrate = 0
+        if baudrate is not None:
+            self.baudrate = toint(baudrate)
+        self._timing = None
+        if str2bool(pacing) and (self.baudrate > 0):
+            self._timing = MockTiming(self.baudrate, UART_MOCK_BITS_PER_BYTE)
 
         debug("Mapped UART bus device - %s" % self.__str__())
         
     def __str__(self):
         return "UART_MOCK"
+
+    def timing(self):
+        return self._timing
     
 #---------- Bus abstraction methods reimplementation ----------
 
@@ -46,20 +108,46 @@ class UART_MOCK(UART_Bus):
     def close(self):
         debug("Closing UART bus device - %s" % self.__str__())
 
-#---------- UART abstraction communication methods redirected to reading/writing a string ----------
+#---------- UART abstraction communication methods redirected to reading/writing a ring buffer ----------
     
     def readString(self):
-        if len(self.string) > 0:
-            string = self.string
-            self.string = ""
-            return string
-        return ""
+        data = self.read(self.available())
+        if PYTHON_MAJOR >= 3:
+            return data.decode("latin-1")
+        return data
     
     def writeString(self, string):
-        self.string += string
+        if isinstance(string, bytes):
+            self.write(string)
+        else:
+            self.write(string.encode("latin-1"))
+
+    def read(self, size=1):
+        with self.rx.lock:
+            return bytes(self.rx.ring.read(size))
+
+    def write(self, data):
+        if not isinstance(data, (bytes, bytearray)):
+            data = bytearray(data)
+        if self._timing is not None:
+            self._timing.transfer(len(data))
+        with self.tx.lock:
+            written = self.tx.ring.write(data)
+            self.tx.dropped += len(data) - written
+        return len(data)
 
     def available(self):
-        return len(self.string)
+        return len(self.rx.ring)
 
+    def dropped(self):
+        return self.rx.dropped
 
+#---------- Helpers ----------
 
+    def __channel__(self, dev, capacity):
+        with MOCKLOCK:
+            channel = CHANNELS.get(dev)
+            if channel is None:
+                channel = UART_MockChannel(capacity)
+                CHANNELS[dev] = channel
+            return channel
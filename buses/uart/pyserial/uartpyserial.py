@@ -17,6 +17,7 @@
 #   Changelog
 #
 #   1.0    2016-08-30    Initial release.
+#   1.1    2026-10-17    Added optional background reader thread.
 #
 #   Implementation and usage remarks
 #
@@ -30,15 +31,38 @@
 #   also for those serial interfaces as well. Just set the dev: parameter to
 #   the correct path including the prefix /dev/....
 #
+#   With reader:true a background thread continuously moves all incoming
+#   bytes from the serial interface into a bounded ring buffer of
+#   buffersize bytes. Each received chunk is stamped with a monotonic
+#   timestamp. read(size, timeout) is then served from memory and returns
+#   as soon as size bytes are available or the timeout (in seconds, default
+#   is the timeout of the bus) has elapsed, so consumers are woken up by the
+#   arrival of data instead of polling. readChunk(timeout) returns the
+#   oldest buffered chunk together with its timestamp. If the ring buffer
+#   overflows, the oldest bytes are dropped and counted in droppedBytes().
+#
+#   Example:
+#   [BUSES]
+#   gps = UART_PYSERIAL dev:/dev/ttyUSB0 baudrate:9600 reader:true
+#
 
 
 from webiopi.devices.bus import Bus, UART_Bus
+from webiopi.devices.buses.ringbuffer import RingBuffer
 from webiopi.utils.types import toint, str2bool
-from serial import Serial
-from webiopi.utils.logger import debug
+from serial import Serial, SerialException
+from webiopi.utils.logger import debug, info
+from threading import Thread, Condition
+from collections import deque
+import time
+
+monotonic = getattr(time, "monotonic", time.time)
+
+#Timeout for the blocking reads of the reader thread, allows to check for stop requests
+UART_READER_POLL_TIMEOUT = 0.1
 
 class UART_PYSERIAL(UART_Bus):
-    def __init__(self, dev="", baudrate=9600, bytesize=8, parity='N', stopbits=1, timeout=0, xonxoff=False, rtscts=False, dsrdtr=False):
+    def __init__(self, dev="", baudrate=9600, bytesize=8, parity='N', stopbits=1, timeout=0, xonxoff=False, rtscts=False, dsrdtr=False, reader=False, buffersize=4096):
         self.port = dev
         self.baudrate = toint(baudrate)
         self.bytesize = toint(bytesize)
@@ -48,6 +72,9 @@ class UART_PYSERIAL(UART_Bus):
         self.xonxoff = str2bool(xonxoff)
         self.rtscts = str2bool(rtscts)
         self.dsrdtr = str2bool(dsrdtr)
+        self.reader = str2bool(reader)
+        self.buffersize = toint(buffersize)
+        self.thread = None
         Bus.__init__(self, "UART", "pyserial:%s" % dev, None)
 
 
@@ -70,24 +97,112 @@ class UART_PYSERIAL(UART_Bus):
                      dsrdtr=self.dsrdtr
                      )
         self.ser = ser
+        if self.reader:
+            self.__startReader__()
 
     def close(self):
         debug("UART_PYSERIAL: Closing serial interface %s" % self.ser.port)
+        self.__stopReader__()
         self.ser.close()
 
 #---------- UART abstraction communication methods redirected to reading/writing using pySerial ----------
 
-    def read(self, size=1):
-        return self.ser.read(size)
+    def read(self, size=1, timeout=None):
+        if self.thread is None:
+            return self.ser.read(size)
+        if timeout is None:
+            timeout = self.timeout
+        deadline = monotonic() + timeout
+        with self.condition:
+            while len(self.ring) < size:
+                remaining = deadline - monotonic()
+                if (remaining <= 0) or not self.running:
+                    break
+                self.condition.wait(remaining)
+            data = self.ring.read(size)
+            self.__consumeChunks__(len(data))
+        return bytes(data)
+
+    def readChunk(self, timeout=None):
+        if self.thread is None:
+            raise Exception("UART_PYSERIAL: readChunk() needs reader:true for %s" % self.port)
+        if timeout is None:
+            timeout = self.timeout
+        deadline = monotonic() + timeout
+        with self.condition:
+            while len(self.chunks) == 0:
+                remaining = deadline - monotonic()
+                if (remaining <= 0) or not self.running:
+                    return (None, bytes())
+                self.condition.wait(remaining)
+            (timestamp, size) = self.chunks[0]
+            data = self.ring.read(size)
+            self.__consumeChunks__(size)
+        return (timestamp, bytes(data))
 
     def write(self, data):
         self.ser.write(data)
 
     def available(self):
+        if self.thread is not None:
+            return len(self.ring)
         return self.ser.in_waiting
 
-
-
-
-
-
+    def droppedBytes(self):
+        if self.thread is not None:
+            return self.ring.dropped
+        return 0
+
+#---------- Background reader thread ----------
+
+    def __startReader__(self):
+        self.ring = RingBuffer(self.buffersize)
+        self.chunks = deque()
+        self.condition = Condition()
+        self.ser.timeout = UART_READER_POLL_TIMEOUT
+        self.running = True
+        self.thread = Thread(target=self.__readerLoop__, name="UART_PYSERIAL reader %s" % self.port)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def __stopReader__(self):
+        if self.thread is None:
+            return
+        self.running = False
+        self.thread.join()
+        self.thread = None
+        self.ser.timeout = self.timeout
+
+    def __readerLoop__(self):
+        ser = self.ser
+        while self.running:
+            try:
+                data = ser.read(max(1, ser.in_waiting))
+                if len(data) == 0:
+                    continue
+                waiting = ser.in_waiting
+                if waiting > 0:
+                    data += ser.read(waiting)
+            except SerialException as e:
+                info("UART_PYSERIAL: Reader thread stopped for %s (%s)" % (self.port, e))
+                break
+            timestamp = monotonic()
+            with self.condition:
+                buffered = len(self.ring)
+                dropped = self.ring.dropped
+                self.ring.write(data, overwrite=True)
+                self.__consumeChunks__(min(self.ring.dropped - dropped, buffered))
+                self.chunks.append((timestamp, min(len(data), self.ring.capacity)))
+                self.condition.notify_all()
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+
+    def __consumeChunks__(self, size):
+        while size > 0:
+            (timestamp, chunkSize) = self.chunks[0]
+            if chunkSize > size:
+                self.chunks[0] = (timestamp, chunkSize - size)
+                return
+            self.chunks.popleft()
+            size -= chunkSize
@@ -0,0 +1,273 @@
+#   Copyright 2026 Andreas Riegg - t-h-i-n-x.net
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+#   ----------------------------------------------------------------------------
+#
+#   Changelog
+#
+#   1.0    2026-10-17    Initial release.
+#
+#   1.1    2026-10-17    DelimiterFramer continues the delimiter search where
+#                        the previous one stopped.
+#
+#   1.2    2026-10-17    Checksum functions iterate frames as bytes on Python 2.
+#
+#   Implementation and usage remarks
+#
+#   Message framing on top of any UART bus (UART_DEV, UART_PYSERIAL,
+#   UART_MOCK). A FrameReader collects the received bytes in a ring buffer
+#   and cuts them into frames using one of these framers:
+#
+#   - DelimiterFramer:     frames terminated by a delimiter, e.g. b"\r\n" for
+#                          NMEA sentences, optionally starting with a start byte
+#   - LengthPrefixFramer:  frames that contain their payload length in a
+#                          header field, e.g. Modbus-RTU read responses
+#   - FixedSizeFramer:     frames of constant size, optionally starting with a
+#                          start byte
+#
+#   Frames are parsed incrementally directly in the ring buffer, the
+#   DelimiterFramer only searches the bytes received since its last search.
+#   Each frame is returned as memoryview into the ring buffer. Only frames
+#   that wrap around the end of the ring buffer are copied into a scratch
+#   buffer. A frame is only valid until the next frame is requested, copy it
+#   (e.g. bytes(frame)) if it has to be kept.
+#
+#   An optional checksum function can be given that gets the frame and returns
+#   True for valid frames. Invalid frames are skipped and counted in errors.
+#   Bytes that cannot be part of a frame (garbage before a start byte, too
+#   long frames) are skipped and counted in discarded.
+#   Checksum functions for NMEA sentences (checkNMEA), Modbus-RTU CRC16
+#   (checkModbusCRC) and XOR checksums (checkXOR) are provided.
+#
+#   Example (NMEA):
+#
+#   reader = FrameReader(bus, DelimiterFramer(b"\r\n", start=b"$"), checksum=checkNMEA)
+#   reader.poll()
+#   for frame in reader.frames():
+#       handleSentence(bytes(frame))
+#
+#   Example (Modbus-RTU response for function code 0x03):
+#
+#   FrameReader(bus, LengthPrefixFramer(lengthOffset=2, lengthSize=1, trailerSize=2), checksum=checkModbusCRC)
+#
+
+from webiopi.devices.buses.ringbuffer import RingBuffer
+
+UART_FRAME_BUFFER_SIZE = 4096
+
+
+#---------- Framers ----------
+
+# frameSize() of all framers returns the size of the complete frame at the
+# start of the ring buffer, 0 if more data is needed or a negative value with
+# the number of bytes to discard for resynchronisation.
+
+class DelimiterFramer():
+    def __init__(self, delimiter=b"\n", start=None, maxSize=0):
+        self.delimiter = bytes(delimiter)
+        self.start = None if start is None else bytes(start)
+        self.maxSize = maxSize
+        # bytes at the start of the ring buffer already searched for the delimiter
+        self.scanned = 0
+
+    def frameSize(self, ring):
+        count = len(ring)
+        if count == 0:
+            self.scanned = 0
+            return 0
+        if self.start is not None:
+            index = ring.find(self.start)
+            if index < 0:
+                return self.__consumed__(-max(1, count - len(self.start) + 1))
+            if index > 0:
+                return self.__consumed__(-index)
+        if self.scanned > count:
+            self.scanned = 0
+        index = ring.find(self.delimiter, max(0, self.scanned - len(self.delimiter) + 1))
+        if index < 0:
+            if ring.isFull() or ((self.maxSize > 0) and (count >= self.maxSize)):
+                return self.__consumed__(-count)
+            self.scanned = count
+            return 0
+        size = index + len(self.delimiter)
+        if (self.maxSize > 0) and (size > self.maxSize):
+            return self.__consumed__(-size)
+        return self.__consumed__(size)
+
+    def __consumed__(self, size):
+        # the reader skips the returned bytes, so the next search starts over
+        self.scanned = 0
+        return size
+
+
+class LengthPrefixFramer():
+    def __init__(self, lengthOffset=0, lengthSize=1, bigEndian=True, trailerSize=0, lengthAdjust=0, start=None):
+        self.lengthOffset = lengthOffset
+        self.lengthSize = lengthSize
+        self.bigEndian = bigEndian
+        self.headerSize = lengthOffset + lengthSize
+        self.trailerSize = trailerSize
+        self.lengthAdjust = lengthAdjust
+        self.start = None if start is None else bytearray(start)[0]
+
+    def frameSize(self, ring):
+        count = len(ring)
+        if count == 0:
+            return 0
+        if (self.start is not None) and (ring.byteAt(0) != self.start):
+            return -1
+        if count < self.headerSize:
+            return 0
+        length = 0
+        for i in range(self.lengthSize):
+            if self.bigEndian:
+                length = (length << 8) | ring.byteAt(self.lengthOffset + i)
+            else:
+                length |= ring.byteAt(self.lengthOffset + i) << (8 * i)
+        size = self.headerSize + length + self.lengthAdjust + self.trailerSize
+        if (size <= 0) or (size > ring.capacity):
+            return -1
+        if count < size:
+            return 0
+        return size
+
+
+class FixedSizeFramer():
+    def __init__(self, size, start=None):
+        self.size = size
+        self.start = None if start is None else bytearray(start)[0]
+
+    def frameSize(self, ring):
+        count = len(ring)
+        if count == 0:
+            return 0
+        if (self.start is not None) and (ring.byteAt(0) != self.start):
+            return -1
+        if count < self.size:
+            return 0
+        return self.size
+
+
+#---------- Frame reader ----------
+
+class FrameReader():
+    def __init__(self, bus, framer, capacity=UART_FRAME_BUFFER_SIZE, checksum=None):
+        self.bus = bus
+        self.framer = framer
+        self.checksum = checksum
+        self.ring = RingBuffer(capacity)
+        self.scratch = bytearray(capacity)
+        self.scratchView = memoryview(self.scratch)
+        self.errors = 0
+        self.discarded = 0
+
+    def __str__(self):
+        return "FrameReader(%s)" % self.bus
+
+    def feed(self, data):
+        return self.ring.write(data)
+
+    def poll(self):
+        fd = getattr(self.bus, "fd", None)
+        if isinstance(fd, int) and (fd > 0):
+            return self.ring.readFrom(fd)
+        size = min(self.bus.available(), self.ring.free())
+        if size <= 0:
+            return 0
+        return self.ring.write(self.bus.read(size))
+
+    def frames(self):
+        while True:
+            size = self.framer.frameSize(self.ring)
+            if size == 0:
+                return
+            if size < 0:
+                self.discarded += self.ring.skip(-size)
+                continue
+            frame = self.__frameView__(size)
+            if (self.checksum is not None) and not self.checksum(frame):
+                self.errors += 1
+                self.ring.skip(size)
+                continue
+            try:
+                yield frame
+            finally:
+                self.ring.skip(size)
+
+    def readFrame(self):
+        for frame in self.frames():
+            return bytes(frame)
+        return None
+
+#---------- Helpers ----------
+
+    def __frameView__(self, size):
+        view = self.ring.views()[0]
+        if len(view) >= size:
+            return view[:size]
+        self.ring.peekinto(self.scratchView[:size])
+        return self.scratchView[:size]
+
+
+#---------- Checksums ----------
+
+def checkXOR(frame):
+    # last byte is the XOR of all preceding bytes
+    frame = bytearray(frame)
+    value = 0
+    for byte in frame[:-1]:
+        value ^= byte
+    return value == frame[-1]
+
+def checkNMEA(frame):
+    # $<sentence>*hh<delimiter>, hh is the XOR of all bytes of <sentence>
+    data = bytes(frame).rstrip(b"\r\n")
+    star = data.rfind(b"*")
+    if (len(data) < 4) or (star < 1) or (len(data) - star != 3):
+        return False
+    value = 0
+    for byte in bytearray(data[1:star]):
+        value ^= byte
+    try:
+        return value == int(data[star+1:], 16)
+    except ValueError:
+        return False
+
+def __crc16ModbusTable__():
+    table = []
+    for i in range(256):
+        crc = i
+        for j in range(8):
+            if crc & 0x0001:
+                crc = (crc >> 1) ^ 0xA001
+            else:
+                crc >>= 1
+        table.append(crc)
+    return table
+
+CRC16_MODBUS_TABLE = __crc16ModbusTable__()
+
+def crc16Modbus(data):
+    crc = 0xFFFF
+    table = CRC16_MODBUS_TABLE
+    for byte in bytearray(data):
+        crc = (crc >> 8) ^ table[(crc ^ byte) & 0xFF]
+    return crc
+
+def checkModbusCRC(frame):
+    # CRC16 of all bytes but the last two, transmitted low byte first
+    if len(frame) < 3:
+        return False
+    frame = bytearray(frame)
+    return crc16Modbus(frame[:-2]) == (frame[-2] | (frame[-1] << 8))
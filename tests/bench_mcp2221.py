@@ -0,0 +1,65 @@
+#   Copyright 2026 Andreas Riegg - t-h-i-n-x.net
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+#   ----------------------------------------------------------------------------
+#
+#   Benchmark of the MCP2221 I2C driver (I2C_MCP2221_HIDRAW) against the emulated
+#   MCP2221 of test_mcp2221 on a socket pair, so no hardware is needed. Prints the
+#   time per call of some bus methods with debug logging off. The times include
+#   the round trips to the emulator thread and show the host side cost of the
+#   driver only, not the USB latency of a real MCP2221. Needs WebIOPi.
+#
+#   Usage: python tests/bench_mcp2221.py [calls]
+#
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from webiopi.devices.buses import i2cmcphidraw
+from webiopi.devices.buses.i2cmcphidraw import I2C_MCP2221_HIDRAW
+from test_mcp2221 import HIDRAW_EMULATOR, HIDRAW_OS
+
+monotonic = getattr(time, "monotonic", time.time)
+
+
+def bench(name, calls, function, *args):
+    function(*args)
+    start = monotonic()
+    for i in range(calls):
+        function(*args)
+    duration = monotonic() - start
+    print("%-28s %8.1f us per call" % (name, duration * 1000000.0 / calls))
+
+
+def main(calls):
+    emulator = HIDRAW_EMULATOR()
+    emulator.registers[0x50] = bytearray(range(256))
+    i2cmcphidraw.os = HIDRAW_OS(emulator)
+    bus = I2C_MCP2221_HIDRAW(dev="hidraw-bench", slave=0x50)
+    try:
+        bench("readRegister", calls, bus.readRegister, 0x10)
+        bench("writeRegister", calls, bus.writeRegister, 0x10, 0x42)
+        bench("readRegisters (180 bytes)", calls, bus.readRegisters, 0x10, 180)
+        bench("writeBytes (181 bytes)", calls, bus.writeBytes, bytearray(181))
+    finally:
+        bus.close()
+        i2cmcphidraw.os = os
+        emulator.socket.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
@@ -0,0 +1,122 @@
+#   Copyright 2026 Andreas Riegg - t-h-i-n-x.net
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+#   ----------------------------------------------------------------------------
+#
+#   Tests of the shared adapter registry (buses/adapters.py). The module has no
+#   WebIOPi dependencies, so it is loaded directly from the source tree.
+#
+
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "buses"))
+
+from adapters import Adapter, AdapterRegistry
+
+
+class AdapterRegistryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = AdapterRegistry()
+
+    def testSharedAdapter(self):
+        first = self.registry.acquire("dev", Adapter)
+        second = self.registry.acquire("dev", Adapter)
+        self.assertIs(first, second)
+        self.assertEqual(first.users, 2)
+        closed = []
+        self.registry.release("dev", closed.append)
+        self.assertEqual(closed, [])
+        self.registry.release("dev", closed.append)
+        self.assertEqual(closed, [first])
+        self.assertIsNone(self.registry.get("dev"))
+
+    def testNestedOpen(self):
+        # e.g. a pooled I2C_MUX whose constructor opens its pooled upstream bus
+        def openOuter(device):
+            adapter = Adapter(device)
+            adapter.inner = self.registry.acquire("inner", Adapter)
+            return adapter
+
+        done = []
+        thread = threading.Thread(target=lambda: done.append(self.registry.acquire("outer", openOuter)))
+        thread.daemon = True
+        thread.start()
+        thread.join(5.0)
+        self.assertEqual(len(done), 1, "nested acquire() deadlocked")
+        self.assertIs(done[0].inner, self.registry.get("inner"))
+        self.assertEqual(self.registry.statistics()["users"], {"outer": 1, "inner": 1})
+
+    def testNestedClose(self):
+        # e.g. a pooled USB-ISS bus whose close() releases its pooled serial bus
+        def openOuter(device):
+            adapter = Adapter(device)
+            self.registry.acquire("inner", Adapter)
+            return adapter
+
+        def closeOuter(adapter):
+            self.registry.release("inner", lambda inner: None)
+
+        self.registry.acquire("outer", openOuter)
+        thread = threading.Thread(target=self.registry.release, args=("outer", closeOuter))
+        thread.daemon = True
+        thread.start()
+        thread.join(5.0)
+        self.assertFalse(thread.is_alive(), "nested release() deadlocked")
+        self.assertEqual(self.registry.statistics()["users"], {})
+
+    def testRecursiveOpenRaises(self):
+        def openSelf(device):
+            return self.registry.acquire(device, openSelf)
+
+        self.assertRaises(Exception, self.registry.acquire, "dev", openSelf)
+        self.assertIsNone(self.registry.get("dev"))
+        self.assertIsNotNone(self.registry.acquire("dev", Adapter))
+
+    def testFailedOpenIsRetried(self):
+        def openFailing(device):
+            raise IOError("cannot open %s" % device)
+
+        self.assertRaises(IOError, self.registry.acquire, "dev", openFailing)
+        adapter = self.registry.acquire("dev", Adapter)
+        self.assertEqual(adapter.users, 1)
+        self.assertEqual(self.registry.statistics()["opened"], 1)
+
+    def testConcurrentAcquireWaitsForOpener(self):
+        opens = []
+
+        def openSlow(device):
+            opens.append(device)
+            time.sleep(0.1)
+            return Adapter(device)
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.registry.acquire("dev", openSlow))) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5.0)
+        self.assertEqual(opens, ["dev"])
+        self.assertEqual(len(results), 4)
+        for adapter in results:
+            self.assertIs(adapter, results[0])
+        self.assertEqual(results[0].users, 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
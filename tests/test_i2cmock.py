@@ -0,0 +1,65 @@
+#   Copyright 2026 Andreas Riegg - t-h-i-n-x.net
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+#   ----------------------------------------------------------------------------
+#
+#   Tests of the built-in register files of I2C_MOCK. The tests need WebIOPi and
+#   are skipped if it is not installed.
+#
+
+import threading
+import unittest
+
+try:
+    from webiopi.devices.buses.i2cmock import I2C_MOCK
+    WEBIOPI = True
+except ImportError:
+    WEBIOPI = False
+
+
+@unittest.skipUnless(WEBIOPI, "WebIOPi is not installed")
+class I2CMockTest(unittest.TestCase):
+
+    def setUp(self):
+        self.buses = [I2C_MOCK(dev="registerlock", slave=0x48, registers=256) for i in range(2)]
+        self.registers = self.buses[0].registerFile()
+
+    def tearDown(self):
+        for bus in self.buses:
+            bus.close()
+
+    def testRegisterPointer(self):
+        self.buses[0].writeRegisters(0x10, bytearray([1, 2, 3]))
+        self.buses[1].writeBytes(bytearray([0x10]))
+        self.assertEqual(self.buses[0].readBytes(2), bytearray([1, 2]))
+        self.assertEqual(self.buses[1].readBytes(1), bytearray([3]))
+        self.assertEqual(self.registers.pointer, 0x13)
+
+    def testAccessWaitsForLock(self):
+        results = []
+        with self.registers.lock:
+            thread = threading.Thread(target=lambda: results.append(self.buses[1].readBytes(1)))
+            thread.daemon = True
+            thread.start()
+            thread.join(0.2)
+            self.assertTrue(thread.is_alive(), "register file accessed without its lock")
+            self.registers.pointer = 0x20
+            self.registers.data[0x20] = 0x42
+        thread.join(5.0)
+        self.assertEqual(results, [bytearray([0x42])])
+        self.assertEqual(self.registers.pointer, 0x21)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,203 @@
+#   Copyright 2026 Andreas Riegg - t-h-i-n-x.net
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+#   ----------------------------------------------------------------------------
+#
+#   Tests of layered buses that share their auxiliary buses via the pool (see
+#   AuxiliaryBus), e.g. a recorder over a USB-ISS bus over a serial bus. The bus
+#   templates are provided by the test instead of a WebIOPi config file. The
+#   tests need WebIOPi and are skipped if it is not installed.
+#
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+try:
+    from webiopi.devices.bus import Bus, UART_Bus
+    from webiopi.devices.buses.auxiliary import AuxiliaryBus, auxiliaryBusStatistics
+    from webiopi.devices.buses.busmonitor import I2C_MONITOR
+    from webiopi.devices.buses.busrecorder import I2C_RECORDER, I2C_REPLAY, SPI_RECORDER
+    from webiopi.devices.buses.busstatistics import getBusStatistics, resetBusStatistics
+    from webiopi.devices.buses.i2cmessage import I2C_Message
+    from webiopi.devices.buses.i2cmock import I2C_MOCK
+    from webiopi.devices.buses.i2cmux import I2C_MUX
+    from webiopi.devices.buses.roboeleusb import I2C_RE_USB_ISS
+    from webiopi.devices.buses.spimock import SPI_MOCK
+    WEBIOPI = True
+except ImportError:
+    WEBIOPI = False
+
+
+#Bus templates of the tests per bus name
+TEMPLATES = {}
+
+def templateOf(self, busName):
+    return TEMPLATES.get(busName)
+
+
+if WEBIOPI:
+    class ISS_SERIAL(UART_Bus):
+        # Serial bus with a USB-ISS in I2C mode behind it, each slave has 256 registers
+        def __init__(self, dev=""):
+            Bus.__init__(self, "UART", "iss-emulator:%s" % dev, None)
+            self.registers = {}
+            self.response = bytearray()
+            self.lock = threading.Lock()
+
+        def open(self):
+            pass
+
+        def close(self):
+            pass
+
+        def available(self):
+            return len(self.response)
+
+        def read(self, size=1):
+            with self.lock:
+                data = bytes(self.response[:size])
+                del self.response[:size]
+                return data
+
+        def write(self, data):
+            data = bytearray(data)
+            with self.lock:
+                while len(data) > 0:
+                    data = self.__command__(data)
+
+        def __command__(self, data):
+            command = data[0]
+            if command == 0x5A:
+                if data[1] == 0x01:
+                    self.response += bytearray([0x07, 0x08, 0x40])
+                    return data[2:]
+                self.response += bytearray([0xFF, 0x00])
+                return data[4:]
+            registers = self.registers.setdefault(data[1] >> 1, bytearray(256))
+            if command == 0x55:
+                (addr, size) = (data[2], data[3])
+                if data[1] & 0x01:
+                    self.response += registers[addr:addr+size]
+                    return data[4:]
+                registers[addr:addr+size] = data[4:4+size]
+                self.response.append(0x01)
+                return data[4+size:]
+            raise ValueError("Unsupported USB-ISS command 0x%02X" % command)
+
+
+@unittest.skipUnless(WEBIOPI, "WebIOPi is not installed")
+class LayeredBusTest(unittest.TestCase):
+
+    def setUp(self):
+        self.getTemplate = AuxiliaryBus.__getAuxiliaryBusTemplate__
+        AuxiliaryBus.__getAuxiliaryBusTemplate__ = templateOf
+        TEMPLATES.clear()
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        AuxiliaryBus.__getAuxiliaryBusTemplate__ = self.getTemplate
+        shutil.rmtree(self.directory)
+
+    def testRecordAndReplayUSBISS(self):
+        TEMPLATES["issserial"] = {"class": ISS_SERIAL, "kwargs": {"dev": "iss"}}
+        TEMPLATES["iss"] = {"class": I2C_RE_USB_ISS, "kwargs": {"dev": "issserial"}}
+        file = os.path.join(self.directory, "iss.rec")
+
+        recorders = [I2C_RECORDER(slave=0x20, dev="iss", file=file), I2C_RECORDER(slave=0x21, dev="iss", file=file)]
+        self.assertEqual(auxiliaryBusStatistics()["users"], {"iss": 2, "issserial": 1})
+        recorders[0].writeRegisters(0x10, bytearray([1, 2, 3]))
+        recorders[1].writeRegister(0x10, 0x42)
+        recorded = [recorders[0].readRegisters(0x10, 3), recorders[1].readRegister(0x10)]
+        self.assertEqual(recorded, [bytearray([1, 2, 3]), 0x42])
+        for recorder in recorders:
+            recorder.close()
+        self.assertEqual(auxiliaryBusStatistics()["users"], {})
+
+        replays = [I2C_REPLAY(slave=0x20, file=file), I2C_REPLAY(slave=0x21, file=file)]
+        replays[0].writeRegisters(0x10, bytearray([1, 2, 3]))
+        replays[1].writeRegister(0x10, 0x42)
+        self.assertEqual([replays[0].readRegisters(0x10, 3), replays[1].readRegister(0x10)], recorded)
+        self.assertEqual(replays[0].mismatches(), 0)
+        self.assertEqual(replays[0].remaining(), 0)
+        for replay in replays:
+            replay.close()
+
+    def testMonitorMuxChannel(self):
+        TEMPLATES["i2c"] = {"class": I2C_MOCK, "kwargs": {"dev": "muxtest", "registers": "256"}}
+        TEMPLATES["mux0"] = {"class": I2C_MUX, "kwargs": {"dev": "i2c", "channel": "1"}}
+        slaves = [I2C_MOCK(dev="muxtest", slave=0x48, registers=256), I2C_MOCK(dev="muxtest", slave=0x49, registers=256)]
+        resetBusStatistics("mux0")
+
+        monitors = [I2C_MONITOR(slave=0x48, dev="mux0"), I2C_MONITOR(slave=0x49, dev="mux0")]
+        self.assertEqual(auxiliaryBusStatistics()["users"], {"mux0": 2, "i2c": 1})
+        monitors[0].writeRegister(0x01, 0x11)
+        monitors[1].writeRegister(0x01, 0x22)
+        self.assertEqual(monitors[0].readRegister(0x01), 0x11)
+        self.assertEqual(monitors[1].readRegisters(0x01, 1), bytearray([0x22]))
+        # a transaction of the first monitor that also addresses the second slave
+        results = monitors[0].transaction([I2C_Message(data=[0x01]), I2C_Message(size=1),
+                                           I2C_Message(data=[0x01], slave=0x49), I2C_Message(size=1, slave=0x49),
+                                           I2C_Message(data=[0x02], slave=0x49), I2C_Message(size=2, slave=0x49)])
+        self.assertEqual(results, [None, bytearray([0x11]), None, bytearray([0x22]), None, bytearray(2)])
+
+        statistics = getBusStatistics("mux0")["mux0"]["slaves"]
+        self.assertEqual((statistics["0x48"]["writes"], statistics["0x48"]["reads"]), (1, 1))
+        self.assertEqual((statistics["0x48"]["transactions"], statistics["0x48"]["transaction bytes"]), (1, 2))
+        self.assertEqual((statistics["0x49"]["writes"], statistics["0x49"]["reads"]), (1, 1))
+        self.assertEqual((statistics["0x49"]["transactions"], statistics["0x49"]["transaction bytes"]), (1, 5))
+        for monitor in monitors:
+            monitor.close()
+        self.assertEqual(auxiliaryBusStatistics()["users"], {})
+        for slave in slaves:
+            slave.close()
+
+    def testMuxWaitsForUpstreamLock(self):
+        TEMPLATES["i2c"] = {"class": I2C_MOCK, "kwargs": {"dev": "muxlock", "registers": "256"}}
+        slave = I2C_MOCK(dev="muxlock", slave=0x48, registers=256)
+        mux = I2C_MUX(slave=0x48, dev="i2c", channel=2)
+        lock = AuxiliaryBus().getAuxiliaryBusLock("i2c")
+
+        results = []
+        with lock:
+            # e.g. a recorder or monitor of the same upstream bus in the middle of a call
+            thread = threading.Thread(target=lambda: results.append(mux.readRegister(0x01)))
+            thread.daemon = True
+            thread.start()
+            thread.join(0.2)
+            self.assertTrue(thread.is_alive(), "mux accessed the upstream bus without its lock")
+        thread.join(5.0)
+        self.assertEqual(results, [0x00])
+        mux.close()
+        slave.close()
+        self.assertEqual(auxiliaryBusStatistics()["users"], {})
+
+    def testConflictingBusParameters(self):
+        TEMPLATES["spi"] = {"class": SPI_MOCK, "kwargs": {"dev": "spi", "fifo": "64", "speed": "1000000"}}
+        file = os.path.join(self.directory, "spi.rec")
+
+        first = SPI_RECORDER(mode=3, dev="spi", file=file)
+        second = SPI_RECORDER(mode=3, speed=1000000, dev="spi", file=file)
+        self.assertRaises(Exception, SPI_RECORDER, mode=3, speed=2000000, dev="spi", file=file)
+        self.assertRaises(Exception, SPI_RECORDER, mode=0, dev="spi", file=file)
+        self.assertEqual(auxiliaryBusStatistics()["users"], {"spi": 2})
+        first.close()
+        second.close()
+        self.assertEqual(auxiliaryBusStatistics()["users"], {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+#   Copyright 2026 Andreas Riegg - t-h-i-n-x.net
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+#   ----------------------------------------------------------------------------
+#
+#   Tests of the MCP2221 I2C driver (I2C_MCP2221_HIDRAW) against an emulated
+#   MCP2221 on the other end of a socket pair that is used as /dev/hidrawX node.
+#   The tests need WebIOPi and are skipped if it is not installed.
+#
+
+import os
+import socket
+import threading
+import unittest
+
+try:
+    from webiopi.devices.buses import i2cmcphidraw
+    from webiopi.devices.buses.i2cmcphidraw import I2C_MCP2221_HIDRAW
+    WEBIOPI = True
+except ImportError:
+    WEBIOPI = False
+
+
+class HIDRAW_EMULATOR():
+    # MCP2221 with slaves of 256 registers each, get data reports after a read
+    # request answer notReady times without data before the data is returned
+    def __init__(self, notReady=0, readError=False):
+        self.notReady = notReady
+        self.readError = readError
+        self.registers = {}
+        self.pointers = {}
+        self.pending = bytearray()
+        self.waiting = 0
+        self.getDataReports = 0
+        (self.socket, peer) = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        self.fd = os.dup(peer.fileno())
+        peer.close()
+        self.thread = threading.Thread(target=self.__serve__)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def __serve__(self):
+        while True:
+            try:
+                request = bytearray(self.socket.recv(64))
+            except (IOError, OSError):
+                return
+            if len(request) == 0:
+                return
+            self.socket.send(bytes(self.__respond__(request)))
+
+    def __respond__(self, request):
+        response = bytearray(64)
+        response[0] = request[0]
+        size = request[1] | (request[2] << 8)
+        slave = request[3] >> 1
+        registers = self.registers.setdefault(slave, bytearray(256))
+        if request[0] in (0x90, 0x94):
+            pointer = request[4]
+            registers[pointer:pointer+size-1] = request[5:4+size]
+            self.pointers[slave] = pointer
+        elif request[0] in (0x91, 0x93):
+            pointer = self.pointers.get(slave, 0)
+            self.pending = registers[pointer:pointer+size]
+            self.waiting = self.notReady
+        elif request[0] == 0x40:
+            self.getDataReports += 1
+            if self.readError:
+                response[1] = 0x41
+                response[3] = 127
+            elif self.waiting > 0:
+                self.waiting -= 1
+                response[1] = 0x41
+            else:
+                count = min(60, len(self.pending))
+                response[3] = count
+                response[4:4+count] = self.pending[:count]
+                del self.pending[:count]
+        return response
+
+
+class HIDRAW_OS():
+    # os module of the driver with open() returning the emulated hidraw node
+    def __init__(self, emulator):
+        self.emulator = emulator
+
+    def open(self, path, flag):
+        return self.emulator.fd
+
+    def __getattr__(self, name):
+        return getattr(os, name)
+
+
+@unittest.skipUnless(WEBIOPI, "WebIOPi is not installed")
+class MCP2221Test(unittest.TestCase):
+
+    def open(self, **kwargs):
+        self.emulator = HIDRAW_EMULATOR(**kwargs)
+        self.os = i2cmcphidraw.os
+        i2cmcphidraw.os = HIDRAW_OS(self.emulator)
+        self.emulator.registers[0x50] = bytearray(range(256))
+        self.bus = I2C_MCP2221_HIDRAW(dev="hidraw-test", slave=0x50)
+
+    def tearDown(self):
+        self.bus.close()
+        i2cmcphidraw.os = self.os
+        self.emulator.socket.close()
+
+    def testMultiReportRead(self):
+        self.open()
+        self.assertEqual(self.bus.readRegisters(0x10, 180), bytearray(range(0x10, 0x10 + 180)))
+        self.assertEqual(self.emulator.getDataReports, 3)
+
+    def testDataNotReady(self):
+        self.open(notReady=3)
+        self.assertEqual(self.bus.readRegisters(0x10, 180), bytearray(range(0x10, 0x10 + 180)))
+        self.assertEqual(self.emulator.getDataReports, 3 + 3)
+        self.assertEqual(self.bus.readRegister(0x20), 0x20)
+
+    def testDataNeverReady(self):
+        self.open(notReady=1000)
+        self.assertRaises(Exception, self.bus.readRegisters, 0x10, 180)
+        self.emulator.notReady = 0
+        self.assertEqual(self.bus.readRegisters(0x30, 2), bytearray([0x30, 0x31]))
+
+    def testReadError(self):
+        self.open(readError=True)
+        self.assertRaises(Exception, self.bus.readRegisters, 0x10, 180)
+        self.emulator.readError = False
+        self.assertEqual(self.bus.readRegisters(0x30, 2), bytearray([0x30, 0x31]))
+
+
+if __name__ == "__main__":
+    unittest.main()